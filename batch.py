@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Batch post processing of many simulation cases in parallel
+
+Each case is a directory containing the 3 Fluent files (profiles, shear stress, pressure gradient)
+and optionally a "case.json" file overriding the command line options for this case :
+    {"x": [1, 2, 3], "profiles_file": "profiles", "tau_file": "shear-stress", "gradp_file": "dp_dx"}
+
+For each case the TBL properties table (with the momentum integral residual) is written to "<output>/<case>_TBL_properties.csv"
+(or .npz, .parquet, .arrow with --format, see export.py)
+and all the cases are merged in "<output>/summary.csv" (one line per station, with the case name
+and the von Kármán momentum integral residual / (C_f/2) of streamwise.py to check the convergence of each case).
+With --store the properties and the scaled profiles of each case are also added to a results store (see store.py)
+to compare the cases later without reading the Fluent files again.
+A case that fails is reported and skipped, the other cases are still processed.
+
+Usage :
+    python batch.py cases/* --x 1 2 3 4 4.5 5 --workers 8 --output results
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from functions import readXcste, readXY, readWallData
+from file_cache import cached_readXcste, cached_readXY
+from profile_set import ProfileSet
+from instrumentation import instrumentation
+from export import export_properties
+from streamwise import streamwise_properties
+from store import ResultsStore
+
+def case_options(case_dir, defaults):
+    # command line options updated with the "case.json" file of the case
+    options = dict(defaults)
+    config = os.path.join(case_dir, "case.json")
+    if os.path.isfile(config):
+        with open(config, 'r') as file:
+            options.update(json.load(file))
+    if not options.get("x"):
+        raise ValueError("no x coordinates given (--x or \"x\" in case.json)")
+    return options
+
+
+def load_case(case_dir, x, profiles_file="profiles", tau_file="shear-stress", gradp_file="dp_dx", use_cache=True):
+    # Read the Fluent files of a case and return its ProfileSet
+    read_profiles, read_wall = (cached_readXcste, cached_readXY) if use_cache else (readXcste, readXY)
+    profiles_dict = read_profiles(os.path.join(case_dir, profiles_file), case_dir)
+    if len(profiles_dict) != len(x):
+        raise ValueError(f"{len(profiles_dict)} profiles imported for {len(x)} x coordinates")
+    wall_data = readWallData([os.path.join(case_dir, tau_file), os.path.join(case_dir, gradp_file)], x,
+                             ["tau_w", "gradp"], read_wall)
+    return ProfileSet(list(profiles_dict.values()), wall_data["tau_w"], wall_data["gradp"], x)
+
+
+def process_case(case_dir, name, defaults, output):
+    # Post process one case, return (name, properties, error, time)
+    start = time.perf_counter()
+    instrumentation.enable(defaults.get("report", False))
+    try:
+        options = case_options(case_dir, defaults)
+        profile_set = load_case(case_dir, options["x"], options["profiles_file"], options["tau_file"],
+                                options["gradp_file"], options["use_cache"])
+        residual = {"momentum_residual": streamwise_properties(profile_set, options["x"])["relative_residual"]}
+        properties = {**profile_set.properties(), **residual}
+        export_properties(profile_set, options["x"], os.path.join(output, name + "_TBL_properties." + options.get("format", "csv")),
+                          residual)
+        if options.get("store"):
+            ResultsStore(options["store"]).append(name, profile_set)
+        if instrumentation.enabled:
+            instrumentation.write_report(os.path.join(output, name + "_report.json"))
+    except Exception as error:
+        return name, None, f"{type(error).__name__}: {error}", time.perf_counter() - start
+    return name, properties, None, time.perf_counter() - start
+
+
+def case_names(case_dirs):
+    # directory names of the cases, made unique
+    names = []
+    for case_dir in case_dirs:
+        base = name = os.path.basename(os.path.normpath(case_dir))
+        n = len(names)
+        while name in names:
+            name = f"{base}_{n}"
+            n += 1
+        names.append(name)
+    return names
+
+
+def pool_results(pool, case_dirs, names, defaults, output):
+    # results of the cases processed by the pool as they complete
+    # a worker that fails (e.g. killed, BrokenProcessPool) makes its case fail, not the batch
+    start = time.perf_counter()
+    futures = {pool.submit(process_case, case_dir, name, defaults, output): name
+               for case_dir, name in zip(case_dirs, names)}
+    for future in as_completed(futures):
+        try:
+            yield future.result()
+        except Exception as error:
+            yield futures[future], None, f"{type(error).__name__}: {error}", time.perf_counter() - start
+
+
+def run_batch(case_dirs, defaults, output, workers=None):
+    # Post process all the cases with a process pool and write the merged summary
+    # return the list of (name, error) of the failed cases
+    os.makedirs(output, exist_ok=True)
+    names = case_names(case_dirs)
+    results = {}
+    if workers == 1:
+        jobs = (process_case(case_dir, name, defaults, output) for case_dir, name in zip(case_dirs, names))
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        jobs = pool_results(pool, case_dirs, names, defaults, output)
+    try:
+        for n, (name, properties, error, duration) in enumerate(jobs, 1):
+            results[name] = (properties, error)
+            status = "done" if error is None else "FAILED - " + error
+            print(f"[{n}/{len(names)}] {name} : {status} ({duration:.2f} s)", flush=True)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # merged summary in the order of the cases
+    with open(os.path.join(output, "summary.csv"), 'w', newline='') as file:
+        writer = csv.writer(file)
+        header = False
+        for name in names:
+            properties, error = results[name]
+            if properties is None:
+                continue
+            if not header:
+                writer.writerow(["case"] + list(properties))
+                header = True
+            for row in np.column_stack(list(properties.values())).tolist():
+                writer.writerow([name] + row)
+    return [(name, results[name][1]) for name in names if results[name][1] is not None]
+
+
+def expand_cases(patterns):
+    # case directories from a list of directories or glob patterns
+    case_dirs = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        case_dirs += [match for match in matches if os.path.isdir(match)]
+    return case_dirs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Post process many Fluent boundary layer cases in parallel")
+    parser.add_argument("cases", nargs="+", help="case directories or glob patterns")
+    parser.add_argument("--x", type=float, nargs="+", help="x coordinates of the profiles (in increasing order)")
+    parser.add_argument("--profiles-file", default="profiles", help="velocity profiles file name")
+    parser.add_argument("--tau-file", default="shear-stress", help="wall shear stress file name")
+    parser.add_argument("--gradp-file", default="dp_dx", help="pressure gradient file name")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the binary cache of the Fluent files")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: number of CPUs)")
+    parser.add_argument("--output", default="results", help="output directory")
+    parser.add_argument("--format", default="csv", choices=["csv", "npz", "parquet", "arrow"], help="format of the case tables")
+    parser.add_argument("--report", action="store_true", help="write the timing and memory report of each case")
+    parser.add_argument("--store", default=None, help="results store directory where the cases are added (see store.py)")
+    args = parser.parse_args(argv)
+
+    case_dirs = expand_cases(args.cases)
+    if not case_dirs:
+        print("Error: no case directory found")
+        return 1
+    defaults = {"x": args.x, "profiles_file": args.profiles_file, "tau_file": args.tau_file,
+                "gradp_file": args.gradp_file, "use_cache": not args.no_cache, "report": args.report,
+                "format": args.format, "store": args.store}
+    failed = run_batch(case_dirs, defaults, args.output, args.workers)
+    print(f"\n{len(case_dirs) - len(failed)}/{len(case_dirs)} cases post processed, summary in {os.path.join(args.output, 'summary.csv')}")
+    for name, error in failed:
+        print(f"\t{name} : {error}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the post processing tool on synthetic cases (see synthetic.py)
+
+For each size (stations x points per station) a synthetic case is written in Fluent format
+and the following stages are timed :
+    parse : readXcste of the profiles file
+    wall data : readWallData of the shear stress and pressure gradient files
+    bl_profile : construction of one "bl_profile" per station
+    properties (bl_profile) : TBL properties computed station by station
+    ProfileSet : construction and TBL properties of all stations at once
+    figures : export of the u+ = f(y+) and β figures (Agg backend)
+The time (best of --repeat runs), the throughput (points/s) and the peak memory (tracemalloc) of each
+stage are printed, and can be saved to a JSON file and compared with a previous JSON file
+
+Usage :
+    python benchmark.py --sizes 12x200 1000x500 --repeat 3 --json bench.json --compare previous.json
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from boundary_layer import bl_profile
+from functions import readXcste, readWallData, TBL_properties
+from profile_set import ProfileSet
+from synthetic import synthetic_case, write_case
+
+def measure(function, repeat):
+    # best time over repeat runs and peak memory of one run, return (time, peak, result)
+    best = np.inf
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def benchmark_case(stations, points, repeat=3, figures=True):
+    # Time all the stages on a synthetic case, return {stage: {"time", "throughput", "peak"}}
+    x, profiles, tau, gradp = synthetic_case(stations, points)
+    x = list(x)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        write_case(directory, x, profiles, tau, gradp)
+        files = [os.path.join(directory, name) for name in ("profiles", "shear-stress", "dp_dx")]
+        stages = {}
+        stages["parse"] = lambda: readXcste(files[0], directory)
+        stages["wall data"] = lambda: readWallData(files[1:], x, ["tau_w", "gradp"])
+        data = list(readXcste(files[0], directory).values())
+        wall = readWallData(files[1:], x, ["tau_w", "gradp"])
+        stages["bl_profile"] = lambda: [bl_profile(data[i], wall["tau_w"][i], wall["gradp"][i], x[i]) for i in range(stations)]
+        stages["properties (bl_profile)"] = lambda: TBL_properties(stages["bl_profile"](), x)
+        stages["ProfileSet"] = lambda: ProfileSet(data, wall["tau_w"], wall["gradp"], x).properties()
+        if figures:
+            from figures import figure_specs, export_figures
+            profile_set = ProfileSet(data, wall["tau_w"], wall["gradp"], x)
+            specs = figure_specs(profile_set, x, ["inner", "beta"])
+            stages["figures"] = lambda: export_figures(specs, directory, ("png",), workers=1)
+        for stage, function in stages.items():
+            duration, peak, result = measure(function, repeat)
+            results[stage] = {"time": duration, "throughput": stations * points / duration, "peak": peak}
+    return results
+
+
+def print_results(size, results, previous=None):
+    print(f"\n{size} (stations x points)")
+    print(f"{'stage':<26}{'time [s]':>12}{'points/s':>14}{'peak [MB]':>12}" + (f"{'speedup':>10}" if previous else ""))
+    for stage, result in results.items():
+        line = f"{stage:<26}{result['time']:>12.4f}{result['throughput']:>14.3e}{result['peak'] / 1e6:>12.2f}"
+        if previous and stage in previous:
+            line += f"{previous[stage]['time'] / result['time']:>10.2f}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the TBL post processing tool on synthetic cases")
+    parser.add_argument("--sizes", nargs="+", default=["12x200", "200x500"], help="stations x points per station")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs of each stage (best time)")
+    parser.add_argument("--no-figures", action="store_true", help="do not time the figure export")
+    parser.add_argument("--json", default=None, help="save the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="JSON file of a previous benchmark to compare with")
+    args = parser.parse_args(argv)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            previous = json.load(file)["results"]
+    report = {"numpy": np.__version__, "python": sys.version.split()[0], "results": {}}
+    for size in args.sizes:
+        stations, points = (int(n) for n in size.lower().split("x"))
+        results = benchmark_case(stations, points, args.repeat, not args.no_figures)
+        report["results"][size] = results
+        print_results(size, results, previous.get(size))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,19 +6,30 @@ Boundary layer profile class :
         mu = 1.7894e-5
         rho = 1.225
     These properties must be changed if the fluid is different
+    The boundary layer edge is found with the method edge_method (see edge.py) :
+        "fraction" (u = edge_fraction*u_e, default 99%), "max_u" or "vorticity"
+        with edge_interpolation = True, ẟ is interpolated between the mesh nodes
+    The integral thicknesses are integrated with the method integration (see quadrature.py) :
+        "trapezoid" (default) or "simpson"
 
     The class takes as input :
         profile : a list of two arrays [y, u]
         tau : shear stress at x
         gradp : pressure gradient at x
         x : x coordinate at which the profile is taken
+        fields (optional) : dictionary of other variables on the same y (k, Reynolds stresses, temperature...)
+                            available in profile.fields, sorted with y
+    y, u and the fields are copied (and sorted if y is not increasing), except the read only views
+    of a "ProfileSet" which are kept as they are
+    float32 arrays stay in float32 (the integrals are accumulated in float64)
 
     The main methods of the class are :
-        u_e : free stream velocity (here u_e = max(u))
+        u_e : free stream velocity (max(u), or u(ẟ) with the vorticity edge)
         utau : friction velocity u_τ
+        clauser_utau : friction velocity u_τ fitted on the log law (Clauser chart, see clauser.py)
         y_plus : y+ = y*utau/nu
         u_plus : u+ = u/utau
-        boundary_thickness : ẟ (99% of u_e)
+        boundary_thickness : ẟ (99% of u_e by default)
         displacement_thickness : ẟ*
         momentum_thickness : θ
         clauser_rotta_thickness : Δ
@@ -32,50 +43,124 @@ Boundary layer profile class :
         p_plus : p+ = gradp nu / utau^3
         K : K = gradp nu / (rho u_e^3)
 
+    ẟ, ẟ*, θ, Δ, u_e and u_τ are computed once and cached,
+    the cache is cleared when y, u, tau, gradp or x are changed
+
 
 @author: Moncef El Moatamid
 date: 2022/2023
 """
 
 import numpy as np
-from math import *
+from functools import wraps
+from edge import boundary_layer_edge
+from quadrature import integration_weights, integrate
+from clauser import clauser_fit
+
+def as_floats(values):
+    # values as a float array of the profile : read only float arrays (views of a ProfileSet) are kept,
+    # the other arrays are copied so that changing the input does not change the profile
+    values = np.asarray(values)
+    if values.dtype.kind == 'f' and not values.flags.writeable:
+        return values
+    return values.astype(values.dtype if values.dtype.kind == 'f' else float)
+
+
+def cached(method):
+    # store the value returned by a method without argument in the profile cache
+    # the cache is cleared whenever y, u, tau, gradp or x are changed
+    name = method.__name__
+    @wraps(method)
+    def wrapper(self):
+        try:
+            return self._cache[name]
+        except KeyError:
+            value = self._cache[name] = method(self)
+            return value
+    return wrapper
+
+def invalidating(name):
+    # attribute stored in the slot "_name" that clears the cache when it is set
+    slot = "_" + name
+    def getter(self):
+        return getattr(self, slot)
+    def setter(self, value):
+        setattr(self, slot, value)
+        self._cache.clear()
+    return property(getter, setter)
 
 class bl_profile:
+    __slots__ = ("_y", "_u", "_tau", "_gradp", "_x", "_cache", "fields")
     mu = 1.7894e-5
     rho = 1.225
     nu = mu/rho
     k = 0.41    
     b = 5.2
+    edge_method = "fraction"
+    edge_fraction = 0.99
+    edge_threshold = 1e-3 # vorticity edge : |du/dy| < edge_threshold*max|du/dy|
+    edge_interpolation = True
+    integration = "trapezoid"
+
+    y = invalidating("y")
+    u = invalidating("u")
+    tau = invalidating("tau") # Shear stress at x
+    gradp = invalidating("gradp") # Pressure gradient at x
+    x = invalidating("x") # x coordinate
 
-    def __init__(self, profile, tau, gradp, x):
+    def __init__(self, profile, tau, gradp, x, fields=None):
+        self._cache = {}
         self.tau = tau # Shear stress at x
         self.x = x # x coordinate
         self.gradp = gradp # Pressure gradient at x
-        y, u = np.array(profile[0]), np.array(profile[1]) # y, u arrays
-        sort_index = np.argsort(y)
-        u, y = u[sort_index], y[sort_index]
-        # find max of u (= u_e here)
-        max_v = max(u)
-        v_frac = u/max_v
-        # find index of 99% of u_e
-        bl_index = 0
-        while v_frac[bl_index]<0.99:
-            bl_index += 1
+        y, u = as_floats(profile[0]), as_floats(profile[1]) # y, u arrays
+        fields = {name: as_floats(values) for name, values in (fields or {}).items()}
+        if np.any(np.diff(y) < 0):
+            sort_index = np.argsort(y)
+            y, u = y[sort_index], u[sort_index]
+            fields = {name: values[sort_index] for name, values in fields.items()}
         # assign values
-        self.u = np.array(u)
-        self.y = np.array(y)
-        self.bl_index = bl_index
-        self.max_v = max_v
+        self.u = u
+        self.y = y
+        # other variables at the same y (the y array is not repeated)
+        self.fields = fields
+
+    @cached
+    def edge(self): # (index of the first point at or above ẟ, ẟ, u_e)
+        bl_index, delta, u_e = boundary_layer_edge(self.y, self.u, [0, len(self.y)], self.edge_method,
+                                                   self.edge_fraction, self.edge_threshold, self.edge_interpolation)
+        return int(bl_index[0]), delta[0], u_e[0]
+
+    @property
+    def bl_index(self): # index of the first point at or above ẟ
+        return self.edge()[0]
+
+    @property
+    def max_v(self): # max of u
+        return max(self.u)
 
     def u_e(self): # free stream velocity
-        return self.max_v
+        return self.edge()[2]
 
+    def integral(self, f): # integral of f from the wall to ẟ
+        offsets = [0, len(self.y)]
+        weights = integration_weights(self.y, offsets, [self.boundary_thickness()], self.integration)
+        return integrate(f, weights, offsets)[0]
+
+    @cached
     def utau(self): # friction velocity u_τ
         return np.sqrt(self.tau/self.rho)
     
-    def boundary_thickness(self): # ẟ (99% of u_e)
-        # y,
-        return self.y[min(self.bl_index,len(self.y)-1)] # [self.bl_index]
+    def clauser_utau(self, **options): # u_τ from the Clauser chart (tau = rho*u_τ² to use it)
+        # with fit_constants=True : (u_τ, k, B)
+        fit = clauser_fit(self.y, self.u, [0, len(self.y)], [self.boundary_thickness()], self.nu, self.k, self.b,
+                          u_e=[self.u_e()], **options)
+        if options.get("fit_constants"):
+            return tuple(values[0] for values in fit)
+        return fit[0]
+    
+    def boundary_thickness(self): # ẟ (99% of u_e by default)
+        return self.edge()[1]
 
     def reynolds_x(self): # reynolds
         return self.u_e() * self.x / self.nu
@@ -120,21 +205,19 @@ class bl_profile:
         ratio = y/delta
         return ratio
 
+    @cached
     def displacement_thickness(self): # ẟ*
         profile = self.u/self.u_e()
-        profile = profile[:self.bl_index + 1]
-        y = self.y[:self.bl_index + 1]
-        delta_star = np.trapz(1 - profile, y)
+        delta_star = self.integral(1 - profile)
         return delta_star
     
     def displacement_thickness_reynolds(self): # Re_ẟ*
         return self.u_e() * self.displacement_thickness() / self.nu
 
+    @cached
     def momentum_thickness(self): # θ
         profile = self.u/self.u_e()
-        profile = profile[:self.bl_index + 1]
-        y = self.y[:self.bl_index + 1]
-        theta = np.trapz(profile * (1 - profile), y)
+        theta = self.integral(profile * (1 - profile))
         return theta
 
     def momentum_thickness_reynolds(self): # Re_θ
@@ -143,10 +226,9 @@ class bl_profile:
     def shape_factor(self): # H = ẟ*/θ 
         return self.displacement_thickness() / self.momentum_thickness()
 
+    @cached
     def clauser_rotta_thickness(self): # Δ
-        y = self.y[:self.bl_index + 1]
-        u = self.u[:self.bl_index + 1]
-        Delta = np.trapz((self.u_e() - u) / self.utau(), y)
+        Delta = self.integral((self.u_e() - self.u) / self.utau())
         return Delta
     
     def y_clauser_rotta_scaling(self): # y/Δ
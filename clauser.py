@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Clauser chart : friction velocity u_τ from the velocity profile itself
+    u_τ is the value for which the profile follows the log law u = u_τ (1/k ln(y u_τ/nu) + B)
+    in the log region, found by least squares (Gauss-Newton) for all stations at once :
+        residual r = u - u_τ f(y+), f(y+) = 1/k ln(y+) + B
+        u_τ <- u_τ + Σ (f + 1/k) r / Σ (f + 1/k)²   (sums over the log region of each station)
+    The log region is yplus_min < y+ and y/ẟ < y_delta_max (default 30 < y+, y < 0.2 ẟ),
+    it is updated at each iteration with the new u_τ
+
+    With fit_constants = True, k and B are then fitted for each station by linear least squares
+    of u+ = 1/k ln(y+) + B over the log region (with the Clauser u_τ)
+
+    The stations are stored in flat y and u arrays sorted by station then by y,
+    offsets gives the start of each station (offsets = [0, len(y)] for a single profile)
+    A station with less than 2 points in its log region gets u_τ = nan
+    nu, k and B can be given for each station (arrays), e.g. to fit several fluids or log law constants at once
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import numpy as np
+from edge import stations
+
+def log_region(y, utau, delta, station, nu, yplus_min=30, y_delta_max=0.2):
+    # points of the log region of each station (nu : one value per station)
+    return (y * utau[station] / nu[station] > yplus_min) & (y < y_delta_max * delta[station])
+
+
+def clauser_fit(y, u, offsets, delta, nu, k=0.41, b=5.2, yplus_min=30, y_delta_max=0.2,
+                u_e=None, iterations=50, tolerance=1e-10, fit_constants=False):
+    # Return u_τ of each station (and k, B of each station if fit_constants)
+    station = stations(offsets)
+    n = len(offsets) - 1
+    delta = np.asarray(delta, dtype=float)
+    nu, k, b = (np.broadcast_to(np.asarray(a, dtype=float), (n,)) for a in (nu, k, b))
+    if u_e is None:
+        u_e = np.maximum.reduceat(u, np.asarray(offsets)[:-1])
+    utau = 0.04 * np.asarray(u_e, dtype=float) # first guess (u_τ/u_e ~ 0.04)
+    for i in range(iterations):
+        region = log_region(y, utau, delta, station, nu, yplus_min, y_delta_max) & (y > 0)
+        s, yr, ur = station[region], y[region], u[region]
+        f = np.log(yr * utau[s] / nu[s]) / k[s] + b[s]
+        residual = ur - utau[s] * f
+        jacobian = f + 1 / k[s]
+        numerator = np.bincount(s, weights=jacobian * residual, minlength=n)
+        denominator = np.bincount(s, weights=jacobian**2, minlength=n)
+        count = np.bincount(s, minlength=n)
+        step = np.divide(numerator, denominator, out=np.zeros(n), where=denominator > 0)
+        # limit the step to keep u_τ positive
+        utau = np.where(count > 1, np.clip(utau + step, 0.5 * utau, 2 * utau), np.nan)
+        if np.all(np.abs(step[count > 1]) <= tolerance * utau[count > 1]):
+            break
+    if not fit_constants:
+        return utau
+    # k and B by linear least squares u+ = a ln(y+) + B in the log region
+    region = log_region(y, utau, delta, station, nu, yplus_min, y_delta_max) & (y > 0) & ~np.isnan(utau[station])
+    s = station[region]
+    ln_yplus = np.log(y[region] * utau[s] / nu[s])
+    uplus = u[region] / utau[s]
+    count = np.bincount(s, minlength=n)
+    sx, sy = np.bincount(s, ln_yplus, n), np.bincount(s, uplus, n)
+    sxx, sxy = np.bincount(s, ln_yplus**2, n), np.bincount(s, ln_yplus * uplus, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (count * sxy - sx * sy) / (count * sxx - sx**2)
+        intercept = (sy - slope * sx) / count
+    return utau, 1 / slope, intercept
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Self similarity of the scaled profiles :
+    the scaled profiles of all the stations are interpolated on a common grid in one call of np.interp
+    (the stations are put one after the other on the x axis by adding station*shift to their scaled y),
+    then the mean profile, the spread (standard deviation between the stations) and a collapse score are computed
+
+    The scalings are the ones of the profile plots (boundary layer part only, y <= ẟ) :
+        inner : u+ = f(y+) (interpolated in log y+)
+        u_ue : u/u_e = f(y/ẟ)
+        defect : (u_e-u)/u_τ = f(y/ẟ)
+        clauser_rotta : (u_e-u)/u_τ = f(y/Δ)
+        y_x : (u_e-u)/u_e = f(y/x)
+        zagarola_smits : (u_e-u)/(u_e ẟ*/ẟ) = f(y/ẟ)
+    The default grid covers the range of the scaled y common to all the stations
+    (ValueError if the ranges do not overlap : a grid must then be given)
+    The collapse score is the RMS of the spread over the grid divided by the range of the mean profile :
+    0 for profiles that collapse perfectly, the lower the better
+
+    The main functions are :
+        resample : values of the scaled profile of each station on a common grid
+        collapse : mean, spread and score of each scaling
+        print_collapse : table of the scores
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import warnings
+import numpy as np
+
+SCALINGS = ("inner", "u_ue", "defect", "clauser_rotta", "y_x", "zagarola_smits")
+
+def scaled_profiles(profiles, scaling):
+    # Return the flat scaled y, scaled u arrays of a ProfileSet and if the y axis is logarithmic
+    s = profiles.station
+    y, u = profiles.y, profiles.u
+    u_e, utau, delta = profiles.u_e[s], profiles.utau[s], profiles.delta[s]
+    if scaling == "inner":
+        return y * utau / profiles.nu, u / utau, True
+    if scaling == "u_ue":
+        return y / delta, u / u_e, False
+    if scaling == "defect":
+        return y / delta, (u_e - u) / utau, False
+    if scaling == "clauser_rotta":
+        return y / profiles.Delta[s], (u_e - u) / utau, False
+    if scaling == "y_x":
+        return y / profiles.x[s], (u_e - u) / u_e, False
+    if scaling == "zagarola_smits":
+        return y / delta, (u_e - u) / (u_e * profiles.delta_star[s] / delta), False
+    raise ValueError(f"unknown scaling {scaling}, available scalings : {', '.join(SCALINGS)}")
+
+
+def resample(profiles, scaling, grid=None, points=100):
+    # Return the grid and the values (stations, grid points) of the scaled profiles on the grid
+    # (nan outside of the range of a station)
+    x, f, log = scaled_profiles(profiles, scaling)
+    station = profiles.station
+    keep = (profiles.y <= profiles.delta[station]) & np.isfinite(x) & np.isfinite(f)
+    if log:
+        keep &= x > 0
+    x, f, station = x[keep], f[keep], station[keep]
+    if log:
+        x = np.log10(x)
+    n = len(profiles)
+    first, last = np.full(n, np.inf), np.full(n, -np.inf)
+    np.minimum.at(first, station, x)
+    np.maximum.at(last, station, x)
+    found = np.isfinite(first) # stations with points
+    if grid is None:
+        start, end = np.max(first[found]), np.min(last[found])
+        if not start < end:
+            raise ValueError(f"the scaled y ranges of the stations do not overlap with the scaling {scaling}, "
+                             "give a grid to resample")
+        grid = np.logspace(start, end, points) if log else np.linspace(start, end, points)
+    grid = np.asarray(grid, dtype=float)
+    query = np.log10(grid) if log else grid
+    # all the stations on one increasing axis
+    shift = max(np.max(last[found]), np.max(query)) - min(np.min(first[found]), np.min(query)) + 1
+    values = np.interp(query[None, :] + shift * np.arange(n)[:, None], x + shift * station, f)
+    values[(query[None, :] < first[:, None]) | (query[None, :] > last[:, None])] = np.nan
+    return grid, values
+
+
+def collapse(profiles, scalings=SCALINGS, points=100):
+    # Return {scaling: {"grid", "values", "mean", "spread", "score"}} for a ProfileSet
+    results = {}
+    for scaling in scalings:
+        grid, values = resample(profiles, scaling, points=points)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning) # grid points outside of all the stations
+            mean = np.nanmean(values, axis=0)
+            spread = np.nanstd(values, axis=0)
+            amplitude = np.nanmax(mean) - np.nanmin(mean)
+            score = np.sqrt(np.nanmean(spread**2)) / amplitude if amplitude > 0 else np.nan
+        results[scaling] = {"grid": grid, "values": values, "mean": mean, "spread": spread, "score": score}
+    return results
+
+
+def print_collapse(results):
+    print(f"{'scaling':<18}{'collapse score':>16}")
+    for scaling, result in results.items():
+        print(f"{scaling:<18}{result['score']:>16.4f}")
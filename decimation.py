@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Decimation of the plotted curves :
+    a curve with more points than the budget is reduced to budget points that keep its shape
+    (largest triangle three buckets, LTTB) :
+        the first and last points are kept, the other points are split into budget-2 buckets
+        and in each bucket the point kept is the one making the largest triangle with
+        the mean points of the previous and next buckets
+    using the mean of the previous bucket (instead of the point kept in it) makes all the buckets
+    independent, so they are all computed at once with numpy
+    The areas are computed in the plotted coordinates : log10 of x and/or y on log axes
+    (the points that are not positive on a log axis are not drawn and are dropped)
+
+    The main functions are :
+        lttb : indices of the points kept
+        decimate_profiles : decimated copy of the (x, y) curves returned by profile_plot0 ... profile_plot6
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import numpy as np
+
+def lttb(x, y, budget, log_x=False, log_y=False):
+    # Return the indices of at most budget points of the curve (x, y) keeping its shape
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    index = np.arange(len(x))
+    visible = np.isfinite(x) & np.isfinite(y)
+    if log_x:
+        visible &= x > 0
+    if log_y:
+        visible &= y > 0
+    index = index[visible]
+    n = len(index)
+    if n <= max(budget, 2):
+        return index
+    budget = max(budget, 3)
+    px = np.log10(x[index]) if log_x else x[index]
+    py = np.log10(y[index]) if log_y else y[index]
+    # buckets of the points 1 ... n-2
+    edges = np.linspace(1, n - 1, budget - 1).astype(int)
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(budget - 2), np.diff(edges))
+    count = np.diff(edges)
+    mean_x = np.add.reduceat(px[1:-1], starts - 1) / count
+    mean_y = np.add.reduceat(py[1:-1], starts - 1) / count
+    # mean points of the previous and next buckets (first and last points at the ends)
+    previous_x, previous_y = np.r_[px[0], mean_x[:-1]], np.r_[py[0], mean_y[:-1]]
+    next_x, next_y = np.r_[mean_x[1:], px[-1]], np.r_[mean_y[1:], py[-1]]
+    ax, ay, cx, cy = previous_x[bucket], previous_y[bucket], next_x[bucket], next_y[bucket]
+    area = np.abs((ax - cx) * (py[1:-1] - ay) - (ax - px[1:-1]) * (cy - ay))
+    # first point of each bucket with the largest area
+    largest = np.flatnonzero(area == np.maximum.reduceat(area, starts - 1)[bucket])
+    largest = largest[np.r_[True, np.diff(bucket[largest]) != 0]]
+    return index[np.r_[0, largest + 1, n - 1]]
+
+
+def decimate_profiles(profiles, budget=None, log_x=False, log_y=False):
+    # Return the curves (x, y) of profiles with at most budget points each (budget = None : unchanged)
+    if not budget:
+        return profiles
+    decimated = []
+    for x, y in profiles:
+        kept = lttb(x, y, budget, log_x, log_y)
+        decimated.append((np.asarray(x)[kept], np.asarray(y)[kept]))
+    return decimated
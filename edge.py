@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Boundary layer edge detection and integration up to the edge :
+    the functions work on one or many stations at once, the stations are stored in
+    flat y and u arrays sorted by station then by y, offsets gives the start of each station
+    (offsets = [0, len(y)] for a single profile)
+
+    The available edge definitions are :
+        fraction : ẟ where u reaches fraction*u_e (default 99%), u_e = max(u)
+        max_u : ẟ at the maximum of u, u_e = max(u)
+        vorticity : ẟ where the vorticity |du/dy| falls below threshold*max|du/dy|
+            (outside of the near wall peak), u_e = u(ẟ)
+
+    With interpolate = True, ẟ is found between the mesh nodes :
+        fraction : linear interpolation of u/u_e between the two nodes around fraction
+        max_u : vertex of the parabola through the maximum and its two neighbours
+        vorticity : linear interpolation of |du/dy| between the two cells around the threshold
+    otherwise ẟ is the y of a mesh node
+
+    The main functions are :
+        boundary_layer_edge : bl_index (first node at or above ẟ), ẟ, u_e of each station
+        truncated_integral : trapezoidal integral of f from the wall to ẟ for each station
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import numpy as np
+
+EDGE_METHODS = ("fraction", "max_u", "vorticity")
+
+def stations(offsets): # station of each point
+    offsets = np.asarray(offsets)
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def first_in_station(mask, station, n):
+    # index of the first True of mask in each station (-1 if there is none)
+    # station must be sorted
+    index = np.flatnonzero(mask)
+    first = np.full(n, -1)
+    if index.size == 0: # no True in any station
+        return first
+    station = station[index]
+    new = np.concatenate(([True], station[1:] != station[:-1]))
+    first[station[new]] = index[new]
+    return first
+
+
+def boundary_layer_edge(y, u, offsets, method="fraction", fraction=0.99, threshold=1e-3, interpolate=True):
+    # Return (bl_index, delta, u_e) arrays with one value per station
+    # bl_index is the index in y of the first node at or above ẟ
+    offsets = np.asarray(offsets)
+    station = stations(offsets)
+    n = len(offsets) - 1
+    starts, ends = offsets[:-1], offsets[1:] - 1
+    u_max = np.maximum.reduceat(u, starts).astype(float) # station values in float64 (float32 profiles)
+    if method == "fraction":
+        v_frac = u / u_max[station]
+        index = first_in_station(v_frac >= fraction, station, n)
+        if np.any(index < 0):
+            raise ValueError(f"u never reaches {fraction}*u_e in stations {np.flatnonzero(index < 0)}")
+        delta = y[index].astype(float)
+        if interpolate:
+            inside = index > starts
+            i0, i1 = index[inside] - 1, index[inside]
+            ratio = (fraction - v_frac[i0]) / (v_frac[i1] - v_frac[i0])
+            delta[inside] = y[i0] + ratio * (y[i1] - y[i0])
+    elif method == "max_u":
+        index = first_in_station(u == u_max[station], station, n)
+        delta = y[index].astype(float)
+        if interpolate:
+            # vertex of the parabola through the maximum and its neighbours
+            inside = (index > starts) & (index < ends)
+            i1 = index[inside]
+            y0, y1, y2 = y[i1 - 1], y[i1], y[i1 + 1]
+            u0, u1, u2 = u[i1 - 1], u[i1], u[i1 + 1]
+            denominator = (y0 - y1) * (y0 - y2) * (y1 - y2)
+            a = (y2 * (u1 - u0) + y1 * (u0 - u2) + y0 * (u2 - u1)) / denominator
+            b = (y2**2 * (u0 - u1) + y1**2 * (u2 - u0) + y0**2 * (u1 - u2)) / denominator
+            vertex = np.where(a < 0, -b / (2 * np.where(a < 0, a, -1)), y1)
+            delta[inside] = np.clip(vertex, y0, y2)
+    elif method == "vorticity":
+        # vorticity in each cell between two consecutive nodes of the same station (cells of zero height skipped)
+        dy = np.diff(y)
+        cells = np.flatnonzero((station[1:] == station[:-1]) & (dy > 0))
+        cell_station = station[cells]
+        omega = np.abs(np.diff(u)[cells] / dy[cells])
+        middle = 0.5 * (y[cells] + y[cells + 1])
+        omega_max = np.zeros(n)
+        np.maximum.at(omega_max, cell_station, omega)
+        omega_max = omega_max[cell_station]
+        peak = first_in_station(omega == omega_max, cell_station, n)
+        below = (omega <= threshold * omega_max) & (np.arange(len(cells)) > peak[cell_station])
+        edge_cell = first_in_station(below, cell_station, n)
+        found = edge_cell >= 0
+        delta = np.array(y[ends], dtype=float) # no edge found : last point of the station
+        delta[found] = middle[edge_cell[found]]
+        if interpolate:
+            c0, c1 = edge_cell[found] - 1, edge_cell[found]
+            level = threshold * omega_max[c1]
+            ratio = (omega[c0] - level) / (omega[c0] - omega[c1])
+            delta[found] = middle[c0] + ratio * (middle[c1] - middle[c0])
+        delta = np.maximum(delta, y[starts])
+    else:
+        raise ValueError(f"unknown edge method {method}, available methods : {', '.join(EDGE_METHODS)}")
+    bl_index = first_in_station(y >= delta[station], station, n)
+    bl_index[bl_index < 0] = ends[bl_index < 0]
+    delta = np.minimum(delta, y[bl_index])
+    if method == "vorticity":
+        u_e = value_at_edge(u, y, bl_index, delta, starts)
+    else:
+        u_e = u_max
+    return bl_index, delta, u_e
+
+
+def value_at_edge(f, y, bl_index, delta, starts):
+    # f at ẟ (linear interpolation between the nodes bl_index-1 and bl_index)
+    value = np.array(f[bl_index], dtype=float)
+    inside = (bl_index > starts) & (y[bl_index] > delta)
+    i0, i1 = bl_index[inside] - 1, bl_index[inside]
+    value[inside] = f[i0] + (f[i1] - f[i0]) * (delta[inside] - y[i0]) / (y[i1] - y[i0])
+    return value
+
+
+def truncated_integral(f, y, offsets, delta):
+    # Trapezoidal integral of f from the wall to ẟ for each station
+    # the cell containing ẟ is integrated up to ẟ with f linearly interpolated
+    station = stations(offsets)
+    y0, y1, f0, f1 = y[:-1], y[1:], f[:-1], f[1:]
+    top = np.minimum(y1, np.asarray(delta)[station[:-1]])
+    cells = (station[1:] == station[:-1]) & (top > y0)
+    y0, y1, f0, f1, top = y0[cells], y1[cells], f0[cells], f1[cells], top[cells]
+    f_top = np.where(top < y1, f0 + (f1 - f0) * (top - y0) / (y1 - y0), f1)
+    area = 0.5 * (f0 + f_top) * (top - y0)
+    return np.bincount(station[:-1][cells], weights=area, minlength=len(offsets) - 1)
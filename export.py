@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Export of the TBL properties and of the scaled profiles to files :
+    the format is chosen from the file extension :
+        .csv : text table
+        .npz : numpy arrays (one array per column, np.load(filename)[column])
+        .parquet : Parquet file (requires pyarrow)
+        .arrow, .feather : Arrow IPC file (requires pyarrow)
+
+    The properties table has one line per station (x, u_e, Re_x, Re_τ, Re_θ, ẟ, ẟ*, θ, H, Δ, β, p+, K)
+    The profiles table has one line per point of each station with the columns of PROFILE_COLUMNS
+    (the scalings of profile_plot0 ... profile_plot6), the stations are written one by one
+    (one chunk of stations per Parquet row group) so that the whole table is never in memory
+
+    The main functions are :
+        export_properties : write the TBL properties table
+        export_profiles : write the scaled profiles table
+        flat_scaled_profiles : scaled profiles columns of a ProfileSet from its flat arrays
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import csv
+import os
+import shutil
+import tempfile
+import zipfile
+import numpy as np
+from functions import TBL_properties
+
+# column : bl_profile method (None : attribute)
+PROFILE_COLUMNS = {
+    "y": None, "u": None,
+    "y_plus": "y_plus", "u_plus": "u_plus",
+    "y_delta": "y_delta_scaling", "u_ue": "u_ue_scaling",
+    "u_defect": "u_outer_scaling", "y_Delta": "y_clauser_rotta_scaling",
+    "y_x": "y_gradp_scaling", "u_gradp": "u_gradp_scaling",
+    "u_zagarola_smits": "u_zagarola_smits_scaling",
+}
+FORMATS = (".csv", ".npz", ".parquet", ".arrow", ".feather")
+
+def file_format(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"unknown format {extension}, available formats : {', '.join(FORMATS)}")
+    return extension
+
+
+def iter_scaled_profiles(profiles, names=None):
+    # yield the columns (all or names) of the scaled profiles of each station
+    # profiles : ProfileSet or list of "bl_profile"
+    names = names or ["station", "x"] + list(PROFILE_COLUMNS)
+    for i, profile in enumerate(profiles):
+        columns = {}
+        for name in names:
+            if name == "station":
+                columns[name] = np.full(len(profile.y), i)
+            elif name == "x":
+                columns[name] = np.full(len(profile.y), float(profile.x))
+            elif PROFILE_COLUMNS[name] is None:
+                columns[name] = getattr(profile, name)
+            else:
+                columns[name] = getattr(profile, PROFILE_COLUMNS[name])()
+        yield columns
+
+
+def flat_scaled_profiles(profiles, index=None):
+    # columns of the scaled profiles of a ProfileSet at the points index of its flat arrays (None : all),
+    # computed from the flat arrays (no "bl_profile" is created)
+    index = slice(None) if index is None else index
+    station = profiles.station[index]
+    y, u = profiles.y[index], profiles.u[index]
+    u_e, utau, delta = profiles.u_e[station], profiles.utau[station], profiles.delta[station]
+    return {"station": station, "x": profiles.x[station], "y": y, "u": u,
+            "y_plus": y * utau / profiles.nu, "u_plus": u / utau,
+            "y_delta": y / delta, "u_ue": u / u_e,
+            "u_defect": (u_e - u) / utau, "y_Delta": y / profiles.Delta[station],
+            "y_x": y / profiles.x[station], "u_gradp": (u_e - u) / u_e,
+            "u_zagarola_smits": (u_e - u) / (u_e * profiles.delta_star[station] / delta)}
+
+
+def import_pyarrow():
+    # pyarrow is only needed for the Parquet and Arrow formats
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("pyarrow is required to export Parquet and Arrow files (pip install pyarrow)")
+    return pyarrow
+
+
+def write_columns(filename, chunks, names):
+    # Write a table given by chunks of lines : chunks(names) yields {name: array} for the columns in names
+    extension = file_format(filename)
+    if extension == ".csv":
+        with open(filename, 'w', newline='') as file:
+            csv.writer(file).writerow(names)
+            for columns in chunks(names):
+                np.savetxt(file, np.column_stack([columns[name] for name in names]), fmt="%.10g", delimiter=",")
+    elif extension == ".npz":
+        # one pass over the chunks : each column is spooled to its own temporary file,
+        # then copied in its ".npy" member of the zip file after the header (length known)
+        with tempfile.TemporaryDirectory() as directory:
+            files = {name: open(os.path.join(directory, str(i)), 'w+b') for i, name in enumerate(names)}
+            dtypes, length = {}, 0
+            try:
+                for columns in chunks(names):
+                    for name in names:
+                        column = np.ascontiguousarray(columns[name])
+                        dtypes.setdefault(name, column.dtype)
+                        files[name].write(column.astype(dtypes[name], copy=False).tobytes())
+                    length += len(columns[names[0]])
+                with zipfile.ZipFile(filename, 'w', allowZip64=True) as archive:
+                    for name in names:
+                        with archive.open(name + ".npy", 'w', force_zip64=True) as file:
+                            descr = np.lib.format.dtype_to_descr(dtypes.get(name, np.dtype(float)))
+                            np.lib.format.write_array_header_2_0(file, {"descr": descr, "fortran_order": False,
+                                                                        "shape": (length,)})
+                            files[name].seek(0)
+                            shutil.copyfileobj(files[name], file)
+            finally:
+                for file in files.values():
+                    file.close()
+    else:
+        pa = import_pyarrow()
+        writer = None
+        try:
+            for columns in chunks(names):
+                table = pa.table({name: columns[name] for name in names})
+                if writer is None: # the schema is the one of the first chunk
+                    if extension == ".parquet":
+                        writer = pa.parquet.ParquetWriter(filename, table.schema)
+                    else:
+                        writer = pa.ipc.new_file(filename, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+def export_properties(profiles, x, filename, extra=None):
+    # Write the TBL properties table (one line per station) with the extra columns {name: values} if given
+    properties = {**TBL_properties(profiles, x), **(extra or {})}
+    write_columns(filename, lambda names: [properties], list(properties))
+
+
+def export_profiles(profiles, filename, chunk_size=100):
+    # Write the scaled profiles table (one line per point), chunk_size stations at a time
+    def chunks(names):
+        chunk = []
+        for columns in iter_scaled_profiles(profiles, names):
+            chunk.append(columns)
+            if len(chunk) == chunk_size:
+                yield {name: np.concatenate([columns[name] for columns in chunk]) for name in names}
+                chunk = []
+        if chunk:
+            yield {name: np.concatenate([columns[name] for columns in chunk]) for name in names}
+    write_columns(filename, chunks, ["station", "x"] + list(PROFILE_COLUMNS))
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Full field mode : wall normal profiles sliced from a 2D field export
+    instead of exporting one line "x_..." per station, the whole field near the wall
+    (x, y, u of every node) is exported once from Fluent and cut into profiles at any number of x
+
+    The field file can be :
+        ASCII (Fluent "Solution Data Export" ASCII) : one header line with the column names
+            (e.g. "nodenumber, x-coordinate, y-coordinate, x-velocity") then one line per node,
+            the columns are separated by commas or spaces
+            the x, y, u columns are parsed chunk by chunk and kept in the binary cache of file_cache.py
+            (memory mapped on the next runs)
+        ".npy" : array of shape (3, number of nodes) with the lines x, y, u (memory mapped)
+        ".bin" : raw float64 values x, y, u node by node (memory mapped)
+
+    The nodes are sorted by x once (sorted index), the nodes of each station are found by binary search :
+        tolerance = None : the mesh column (nodes with the same x) closest to each station
+        tolerance = dx : the nodes with |x - x_station| <= dx (unstructured meshes)
+    Only the nodes of the stations are read from the memory mapped field
+
+    The main functions are :
+        read_field : x, y, u arrays of the field
+        slice_field : x and [y, u] profile of each station
+        field_profiles : read_field + slice_field, the stations can be a number (evenly spaced in x) or a list
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import re
+import numpy as np
+from file_cache import load_cache, save_cache
+from instrumentation import instrumentation
+
+FIELD_COLUMNS = ("x-coordinate", "y-coordinate", "x-velocity") # names of the x, y, u columns
+SEPARATOR = re.compile(r'[,\s]+')
+
+def read_ascii_field(filename, columns=FIELD_COLUMNS, chunk_size=1 << 24):
+    # Parse the x, y, u columns of an ASCII field export, return an array (3, number of nodes)
+    with open(filename, 'r') as file:
+        header = [name.lower() for name in SEPARATOR.split(file.readline().strip())]
+        try:
+            index = [header.index(name.lower()) for name in columns]
+        except ValueError:
+            raise ValueError(f"{filename}: columns {', '.join(columns)} not all found in the header {', '.join(header)}")
+        blocks = []
+        rest = ''
+        while True:
+            with instrumentation.stage("file read"):
+                chunk = file.read(chunk_size)
+            text = rest + chunk
+            end = text.rfind('\n') + 1 if chunk else len(text)
+            text, rest = text[:end], text[end:]
+            if text.strip():
+                with instrumentation.stage("parse"):
+                    values = np.fromstring(text.replace(',', ' '), sep=' ')
+                if values.size % len(header):
+                    raise ValueError(f"{filename}: lines do not all have {len(header)} values")
+                blocks.append(values.reshape(-1, len(header))[:, index].T)
+            if not chunk:
+                break
+    return np.concatenate(blocks, axis=1) if blocks else np.empty((3, 0))
+
+
+def read_field(filename, columns=FIELD_COLUMNS, use_cache=True):
+    # Return the x, y, u arrays of a field export (memory mapped when possible)
+    with instrumentation.stage("field read"):
+        if filename.endswith(".npy"):
+            data = np.load(filename, mmap_mode='r')
+        elif filename.endswith(".bin"):
+            data = np.memmap(filename, dtype='<f8', mode='r').reshape(-1, 3).T
+        else:
+            cache = load_cache(filename) if use_cache else None
+            if cache is None or cache[1].get("columns") != list(columns):
+                data = read_ascii_field(filename, columns)
+                if use_cache:
+                    save_cache(filename, data, {"columns": list(columns)})
+            else:
+                data = cache[0]
+    if data.shape[0] != 3:
+        raise ValueError(f"{filename}: the field must have 3 lines x, y, u (shape {data.shape})")
+    return data[0], data[1], data[2]
+
+
+def slice_field(x, y, u, stations, tolerance=None):
+    # Return the x coordinates and the [y, u] profiles of the stations
+    # tolerance = None : closest mesh column (its x is returned), otherwise nodes at |x - station| <= tolerance
+    # the stations without any node are dropped
+    with instrumentation.stage("field slicing"):
+        order = np.argsort(x, kind='stable') # sorted index of the nodes
+        x_sorted = np.asarray(x)[order]
+        stations = np.asarray(stations, dtype=float)
+        if tolerance is None:
+            columns = np.unique(x_sorted)
+            i = np.searchsorted(columns, stations)
+            lower = columns[np.clip(i - 1, 0, len(columns) - 1)]
+            upper = columns[np.clip(i, 0, len(columns) - 1)]
+            closest = np.where(stations - lower <= upper - stations, lower, upper)
+            stations = np.unique(closest) # two stations in the same column give the same profile
+            start, end = np.searchsorted(x_sorted, stations, 'left'), np.searchsorted(x_sorted, stations, 'right')
+        else:
+            start = np.searchsorted(x_sorted, stations - tolerance, 'left')
+            end = np.searchsorted(x_sorted, stations + tolerance, 'right')
+        keep = end > start
+        profiles = []
+        for i, j in zip(start[keep], end[keep]):
+            nodes = np.sort(order[i:j]) # read the memory mapped field in file order
+            profiles.append([np.asarray(y[nodes]), np.asarray(u[nodes])])
+    return list(stations[keep]), profiles
+
+
+def field_profiles(filename, stations, tolerance=None, columns=FIELD_COLUMNS, use_cache=True):
+    # Read a field export and slice it at the stations (a list of x, or a number of stations evenly spaced in x)
+    x, y, u = read_field(filename, columns, use_cache)
+    if np.isscalar(stations):
+        stations = np.linspace(np.min(x), np.max(x), int(stations))
+    return slice_field(x, y, u, stations, tolerance)
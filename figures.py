@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Headless export of the post processing figures :
+    the figures are rendered with the Agg backend (no window, no plt.show) and saved
+    as png, svg or pdf files, independent figures are rendered in parallel processes
+    and each process reuses the same figure object for all its figures
+
+    The available figures are :
+        raw : u = f(y)
+        u_ue : u/u_e = f(y/ẟ)
+        inner : u+ = f(y+)
+        defect : (u_e-u)/u_τ = f(y/ẟ)
+        clauser_rotta : (u_e-u)/u_τ = f(y/Δ)
+        y_x : (u-u_e)/u_e = f(y/x)
+        zagarola_smits : (u-u_e)/(u_e ẟ*/ẟ) = f(y/ẟ)
+        beta, p_plus, K : curves β(x), p+(x), K(x)
+        momentum_balance : residual of the von Kármán momentum integral equation / (C_f/2) (see streamwise.py)
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from functions import *
+from streamwise import streamwise_properties
+from decimation import decimate_profiles
+from instrumentation import Instrumentation, instrumentation
+
+# name : (plot function, labels, log scale)
+PROFILE_FIGURES = {
+    "raw": (profile_plot0, ["u [m/s]", "y [m]"], False),
+    "u_ue": (profile_plot1, ["u/u_e", "y/delta"], False),
+    "inner": (profile_plot2, ["y+", "u+"], True),
+    "defect": (profile_plot3, ["y/delta", "(ue-u)/u_tau"], False),
+    "clauser_rotta": (profile_plot4, ["y/Delta", "(u_e-u)/u_tau"], False),
+    "y_x": (profile_plot5, ["y/x", "(u-u_e)/u_e"], False),
+    "zagarola_smits": (profile_plot6, ["y/delta", "(u-u_e)/(u_e delta*/delta)"], False),
+}
+# name : (title, y label)
+CURVE_FIGURES = {
+    "beta": ("Clauser's pressure gradient parameter : β", "β"),
+    "p_plus": ("Pressure gradient parameter : p+", "p+"),
+    "K": ("Launder's acceleration parameter : K", "K"),
+    "momentum_balance": ("von Kármán momentum integral residual", "residual / (C_f/2)"),
+}
+FIGURE_NAMES = list(PROFILE_FIGURES) + list(CURVE_FIGURES)
+
+figure = None # figure reused by all the figures rendered in this process
+
+
+def draw_figure(ax, profiles, legend, title, labels, line, log_scale):
+    # same figure as profile_plotting drawn on the axes ax
+    for i, profile in enumerate(profiles):
+        ax.plot(profile[0], profile[1], line[i], label=legend[i])
+    ax.set_title(title)
+    ax.set_ylabel(labels[1])
+    ax.set_xlabel(labels[0])
+    if log_scale:
+        ax.set_xscale('log')
+    if any(legend):
+        ax.legend(fontsize = 9)
+
+
+def figure_specs(profiles, x, names, legends=None, titles=None, log_law=True, sub_layer=True, smoothing=None,
+                 max_points=None):
+    # Data of the figures in names (profiles : ProfileSet or list of "bl_profile")
+    # legends : legend variable of each figure (see write_legend), titles : title of each figure
+    # smoothing : smoothing of the momentum balance (see streamwise.py)
+    # max_points : maximum number of points per profile curve (see decimation.py)
+    legends, titles = legends or {}, titles or {}
+    properties = TBL_properties(profiles, x)
+    if "momentum_balance" in names:
+        properties["momentum_balance"] = streamwise_properties(profiles, x, smoothing)["relative_residual"]
+    specs = []
+    for name in names:
+        if name in PROFILE_FIGURES:
+            plot, labels, log_scale = PROFILE_FIGURES[name]
+            data = decimate_profiles(plot(profiles), max_points, log_x=log_scale)
+            legend = write_legend(x, profiles, legends.get(name, "Re_x"))
+            line = ["-" for i in range(len(data))]
+            if name == "inner":
+                if log_law:
+                    data.append(profiles[0].log_region())
+                    legend.append("Log-law")
+                    line.append("--")
+                if sub_layer:
+                    data.append(profiles[0].sub_layer())
+                    legend.append("U+ = y+")
+                    line.append("--")
+            specs.append({"name": name, "profiles": data, "legend": legend, "title": titles.get(name, "Velocity profiles"),
+                          "labels": labels, "line": line, "log_scale": log_scale})
+        elif name in CURVE_FIGURES:
+            title, label = CURVE_FIGURES[name]
+            specs.append({"name": name, "profiles": [(properties["x"], properties[name])], "legend": [None],
+                          "title": titles.get(name, title), "labels": ["x [m]", label], "line": ["o"], "log_scale": False})
+        else:
+            raise ValueError(f"unknown figure {name}, available figures : {', '.join(FIGURE_NAMES)}")
+    return specs
+
+
+def render_figure(spec, directory, formats, instrumented=False):
+    # Render one figure with the Agg backend and save it in each format
+    # return the files and the instrumentation stages of the figure (recorded if instrumented)
+    global figure
+    recorder = Instrumentation(instrumented)
+    with recorder.stage("figure " + spec["name"]):
+        if figure is None:
+            figure = Figure()
+            FigureCanvasAgg(figure)
+        figure.clear()
+        draw_figure(figure.add_subplot(), spec["profiles"], spec["legend"], spec["title"], spec["labels"],
+                    spec["line"], spec["log_scale"])
+        files = []
+        for fmt in formats:
+            files.append(os.path.join(directory, f"{spec['name']}.{fmt}"))
+            figure.savefig(files[-1])
+    return files, recorder.stages
+
+
+def export_figures(specs, directory, formats=("png",), workers=None):
+    # Export the figures to directory, in parallel processes unless workers = 1
+    os.makedirs(directory, exist_ok=True)
+    instrumented = instrumentation.enabled
+    if workers == 1 or len(specs) < 2:
+        results = [render_figure(spec, directory, formats, instrumented) for spec in specs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(render_figure, specs, repeat(directory), repeat(formats), repeat(instrumented)))
+    files = []
+    for figure_files, stages in results:
+        files += figure_files
+        instrumentation.merge(stages)
+    return files
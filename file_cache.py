@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Binary cache of the parsed Fluent files :
+    the arrays read from a Fluent file are saved next to it in "<file>.cache.npy"
+    and the cache key in "<file>.cache.json"
+
+    The cache key is made of the path, size, modification time and a content hash (blake2b) of the file :
+        same size and modification time : the cache is reloaded directly
+        same size but different modification time : the file is hashed and the cache is
+            reloaded if the content did not change
+        otherwise the file is parsed again and the cache is rewritten
+
+    The cached arrays are reloaded with a memory map (np.load(mmap_mode='r')), only the
+    stations that are actually used are read from the disk
+
+    The main functions are :
+        cached_readXcste : same as readXcste (functions.py) with the cache
+        cached_readXY : same as readXY (functions.py) with the cache
+        cached_readXlist : same as readXlist (functions.py) with the cache
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import numpy as np
+import hashlib
+import json
+import os
+from functions import iterXcste, readXY
+from instrumentation import instrumentation
+from lazy_profiles import LazyProfiles
+
+def file_hash(filename, chunk_size=1 << 24): # content hash of a file
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_key(filename): # path, size and modification time of a file
+    stat = os.stat(filename)
+    return {"path": os.path.abspath(filename), "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+
+def load_cache(filename):
+    # Return (data, index) from the cache of filename, None if there is no valid cache
+    with instrumentation.stage("cache load"):
+        return read_cache(filename)
+
+
+def read_cache(filename):
+    key = file_key(filename)
+    try:
+        with open(filename + ".cache.json", 'r') as file:
+            cache = json.load(file)
+        if cache["path"] != key["path"] or cache["size"] != key["size"]:
+            return None
+        if cache["mtime"] != key["mtime"]:
+            # the file was touched : check its content
+            if cache["hash"] != file_hash(filename):
+                return None
+            cache["mtime"] = key["mtime"]
+            write_json(filename + ".cache.json", cache)
+        data = np.load(filename + ".cache.npy", mmap_mode='r')
+    except (OSError, ValueError, KeyError):
+        return None
+    return data, cache["index"]
+
+
+def save_cache(filename, data, index):
+    # Save the arrays read from filename in its cache, the cache is skipped if it cannot be written
+    cache = file_key(filename)
+    cache["hash"] = file_hash(filename)
+    cache["index"] = index
+    try:
+        np.save(filename + ".cache.tmp.npy", data)
+        os.replace(filename + ".cache.tmp.npy", filename + ".cache.npy")
+        write_json(filename + ".cache.json", cache)
+    except OSError:
+        pass
+
+
+def write_json(filename, content):
+    with open(filename + ".tmp", 'w') as file:
+        json.dump(content, file)
+    os.replace(filename + ".tmp", filename)
+
+
+def cached_readXcste(filename, dir, lazy=False):
+    # readXcste with the cache : the stations are views of the memory mapped cache
+    # without a valid cache and with lazy, the stations are parsed when they are used (LazyProfiles)
+    # and the cache is not written (e.g. only some stations are used)
+    cache = load_cache(filename)
+    if cache is None and lazy:
+        return LazyProfiles(filename)
+    if cache is None:
+        x, offsets, blocks = [], [0], []
+        for x_i, y, u in iterXcste(filename):
+            x.append(x_i)
+            offsets.append(offsets[-1] + len(y))
+            blocks.append(np.array([y, u]))
+        data = np.concatenate(blocks, axis=1) if blocks else np.empty((2, 0))
+        save_cache(filename, data, {"x": x, "offsets": offsets})
+    else:
+        data, index = cache
+        x, offsets = index["x"], index["offsets"]
+    return {x[i]: data[:, offsets[i]:offsets[i + 1]] for i in range(len(x))}
+
+
+def cached_readXY(filename, sort=True):
+    # readXY with the cache (the cached values are always sorted by x)
+    cache = load_cache(filename)
+    if cache is None:
+        data = np.array(readXY(filename))
+        save_cache(filename, data, {})
+    else:
+        data = cache[0]
+    return data[0], data[1]
+
+
+def cached_readXlist(filename, x_list):
+    # readXlist with the cache
+    x, values = cached_readXY(filename)
+    return np.interp(np.array(x_list), x, values)
@@ -6,80 +6,210 @@ Useful functions for post processing turbulent boundary layer velocity profiles
 date: 2022/2023
 """
 import numpy as np
-import matplotlib.pyplot as plt
+import os
 import re
+from instrumentation import instrumentation
+from streamwise import streamwise_properties
+from decimation import decimate_profiles
+
+def pyplot(): # matplotlib is only imported when a figure is plotted
+    import matplotlib.pyplot as plt
+    return plt
 
 #############################################################################
 ############################# Read Fluent files #############################
 #############################################################################
 
+XY_LABEL = re.compile(r'xy/key/label "x_(\d+)"\)') # profiles lines named "x_..."
+ANY_LABEL = re.compile(r'xy/key/label "([^"]*)"\)')
+COLUMN_LABELS = re.compile(r'\(labels((?: "[^"]*")+)\)') # (labels "Position" "X Velocity" ...)
+
+def parse_block(block, filename, label):
+    # values (number of points, number of columns) of the numeric block of the group label, parsed in one call
+    with instrumentation.stage("parse"):
+        columns = max(len(block.lstrip().split('\n', 1)[0].split()), 1)
+        values = np.fromstring(block, sep=' ')
+    if values.size % columns:
+        raise ValueError(f"{filename}: group {label} does not have {columns} values per line")
+    return values.reshape(-1, columns)
+
+
+def iterGroups(filename, label=ANY_LABEL, chunk_size=1 << 20):
+    # Stream a Fluent xy file and yield (label, values) for each "xy/key/label" group matching label
+    # values is an array (number of points, number of columns), the header lines are skipped
+    # The file is read chunk by chunk so that only the current group is held in memory,
+    # the numeric block of each group is parsed in one call with numpy
+    # (a group larger than a chunk is collected in a list of chunks, only the new chunk is searched
+    # for the end of the group and the chunks are joined once)
+    with open(filename, 'r') as file:
+        buffer = ''
+        start = 0
+        while True:
+            match = label.search(buffer, start)
+            if match is None:
+                # no label in the buffer : read the next chunk (keeping a label cut by the chunk)
+                with instrumentation.stage("file read"):
+                    chunk = file.read(chunk_size)
+                if not chunk:
+                    return
+                buffer = buffer[max(start, len(buffer) - 256):] + chunk
+                start = 0
+                continue
+            end = buffer.find(')', match.end())
+            if end >= 0:
+                yield match.group(1), parse_block(buffer[match.end():end], filename, match.group(1))
+                start = end + 1
+                continue
+            # group not complete in the buffer : read chunks until its end
+            pieces = [buffer[match.end():]]
+            while end < 0:
+                with instrumentation.stage("file read"):
+                    chunk = file.read(chunk_size)
+                if not chunk: # incomplete last group
+                    return
+                end = chunk.find(')')
+                pieces.append(chunk if end < 0 else chunk[:end])
+            yield match.group(1), parse_block(''.join(pieces), filename, match.group(1))
+            buffer, start = chunk[end + 1:], 0
+
+
+def iterXcste(filename, chunk_size=1 << 20):
+    # Stream a Fluent file with multiple plots and yield (x, y, u) for each "x_..." group
+    for label, values in iterGroups(filename, XY_LABEL, chunk_size):
+        yield float(label), values[:, 0], values[:, 1]
+
+
 def readXcste(filename, dir):
     # Read a Fluent file with multiple plots (e.g. velocity profiles at different x coordinates)
     # and return a dictionary with the x coordinates as keys and the corresponding data as values
     # code adapted from Julie's code
+    data = {}
+    for x, y, u in iterXcste(filename):
+        data[x] = np.array([y, u])
+    return data
+
 
-    with open(filename,'r') as file:
-        filedata = file.read()
-    Groups = re.findall('xy\/key\/label "x_(\d+)"\)\s([\s\d\-e\.]+)\)\s',filedata)
-    # Groups = re.findall('xy\/key\/label "x_([\d+\.])"\)\s([\s\d\-e\.]+)\)\s',filedata)
-    xValues = np.ones((len(Groups),1))
+def readLabels(filename):
+    # names of the columns of a Fluent xy file from its header (without "Position"), [] if there is none
+    with open(filename, 'r') as file:
+        header = file.read(4096).split("((xy", 1)[0]
+    match = COLUMN_LABELS.search(header)
+    return re.findall(r'"([^"]*)"', match.group(1))[1:] if match else []
+
+
+def readVariables(filenames, names=None):
+    # Read several Fluent files with the same "x_..." lines (velocity, k, Reynolds stresses, temperature...)
+    # or files with several columns, each file in a single pass,
+    # and return {x: {"y": y, name: values, ...}} with the variables of all the files at each station
+    # names : list of the column names of each file (default : labels of the file header)
+    # the stations share the y array of the first file, a file with another y grid at a station
+    # is linearly interpolated on it
     data = {}
-    for i in range(0,len(Groups)):
-        xValues[i]=float(Groups[i][0])
-        data[float(xValues[i])]=np.transpose(np.array([[float(j) for j in k.split('\t')] for k in Groups[i][1].splitlines()]))
+    for n, filename in enumerate(filenames):
+        columns = list(names[n]) if names else readLabels(filename)
+        stations = set()
+        for label, values in iterGroups(filename, XY_LABEL):
+            x, y = float(label), values[:, 0]
+            if len(columns) != values.shape[1] - 1:
+                if names or values.shape[1] != 2:
+                    raise ValueError(f"{filename}: {values.shape[1] - 1} columns for the names {columns}")
+                columns = [os.path.basename(filename)] # one column without label
+            if n == 0:
+                station = data[x] = {"y": y}
+            elif x not in data:
+                raise ValueError(f"{filename}: line x_{label} is not in {filenames[0]}")
+            else:
+                station = data[x]
+            if not np.array_equal(y, station["y"]):
+                # other y grid : interpolation on the y of the first file
+                sort_index = np.argsort(y, kind='stable')
+                values = np.column_stack([y] + [np.interp(station["y"], y[sort_index], values[sort_index, i])
+                                                for i in range(1, values.shape[1])])
+            for i, name in enumerate(columns, 1):
+                station[name] = values[:, i]
+            stations.add(x)
+        if len(stations) != len(data):
+            raise ValueError(f"{filename}: {len(data) - len(stations)} lines of {filenames[0]} are missing")
     return data
 
 
+def readXY(filename, sort=True):
+    # Read a Fluent file at y = const and return the x coordinates and the values (sorted by x if sort)
+    groups = [values for label, values in iterGroups(filename)]
+    if not groups:
+        raise ValueError(f"{filename}: no xy/key/label group found")
+    values = np.concatenate(groups)
+    x, values = values[:, 0], values[:, 1]
+    if sort:
+        sort_index = np.argsort(x, kind='stable')
+        x, values = x[sort_index], values[sort_index]
+    return x, values
+
+
 def readXlist(filename, x_list):
     # Read a Fluent file at y = const and return values at the x coordinates in x_list
-    file = open(filename, "r")
-    lines = file.readlines()
-    shear_stress = []
-    x  = []
-    for i in range(4,len(lines)-1):
-        coord = lines[i].strip("\n").split("\t")
-        x.append(float(coord[0]))
-        shear_stress.append(float(coord[1]))
-    sort_index = np.argsort(x)
-    shear_stress, x = np.array(shear_stress), np.array(x)
-    shear_stress, x = shear_stress[sort_index], x[sort_index]
+    x, shear_stress = readXY(filename)
     tau_list = np.interp(np.array(x_list), x, shear_stress)
     return tau_list
 
+
+def readWallData(filenames, x_list, names=None, read=readXY):
+    # Read several Fluent files at y = const (tau_w, dp/dx, heat flux, Cp...) and return a dictionary
+    # {name: values at the x coordinates in x_list} (names default to the file names)
+    # Files with the same x grid share one sort index and one set of interpolation weights,
+    # all the quantities of a grid are interpolated at once (same result as np.interp)
+    names = list(names or filenames)
+    x_list = np.asarray(x_list, dtype=float)
+    grids = [] # (x, [(name, values)])
+    for name, filename in zip(names, filenames):
+        x, values = read(filename, sort=False)
+        for grid in grids:
+            if np.array_equal(grid[0], x):
+                grid[1].append((name, values))
+                break
+        else:
+            grids.append((x, [(name, values)]))
+    table = {}
+    with instrumentation.stage("wall data interpolation"):
+        for x, columns in grids:
+            values = np.array([column[1] for column in columns])
+            if np.any(np.diff(x) < 0):
+                sort_index = np.argsort(x, kind='stable')
+                x, values = x[sort_index], values[:, sort_index]
+            if len(x) == 1:
+                interpolated = np.repeat(values, len(x_list), axis=1)
+            else:
+                # linear interpolation, constant outside of the x range
+                right = np.clip(np.searchsorted(x, x_list, side='right'), 1, len(x) - 1)
+                left = right - 1
+                dx = x[right] - x[left]
+                weight = np.divide(x_list - x[left], dx, out=np.zeros_like(x_list), where=dx > 0)
+                # at or after the last node (repeated or not) : value of the last node, as np.interp
+                weight = np.where(x_list >= x[right], 1, np.clip(weight, 0, 1))
+                interpolated = values[:, left] * (1 - weight) + values[:, right] * weight
+            for column, row in zip(columns, interpolated):
+                table[column[0]] = row
+    return {name: table[name] for name in names}
+
 #############################################################################
 ########################## Plot velocity profiles ###########################
 #############################################################################
 
 def write_legend(x, profiles, variable):
+    properties = TBL_properties(profiles, x)
+    formats = {"Re_x": "Re_x={:.1e}", "Re_tau": "Re_τ={:.1e}", "Re_theta": "Re_θ={:.1e}",
+               "p_plus": "p+={:.5f}", "beta": "β={:.3f}", "K": "K={:.3e}"}
     legend = []
-    if variable == "Re_x":
-        for i in range(len(x)):
-            Re = profiles[i].reynolds_x()
-            legend.append(f"x={x[i]}m - Re_x={Re:.1e}")
-    elif variable == "Re_tau":
-        for i in range(len(x)):
-            Re = profiles[i].friction_reynolds()
-            legend.append(f"x={x[i]}m - Re_τ={Re:.1e}")
-    elif variable == "Re_theta":
-        for i in range(len(x)):
-            Re = profiles[i].momentum_thickness_reynolds()
-            legend.append(f"x={x[i]}m - Re_θ={Re:.1e}")
-    elif variable == "p_plus":
-        for i in range(len(x)):
-            p_plus = profiles[i].p_plus()
-            legend.append(f"x={x[i]}m - p+={p_plus:.5f}")
-    elif variable == "beta":
+    if variable in formats:
         for i in range(len(x)):
-            beta = profiles[i].beta()
-            legend.append(f"x={x[i]}m - β={beta:.3f}")
-    elif variable == "K":
-        for i in range(len(x)):
-            K = profiles[i].launder_acceleration_parameter()
-            legend.append(f"x={x[i]}m - K={K:.3e}")
+            legend.append(f"x={x[i]}m - " + formats[variable].format(properties[variable][i]))
     return legend
     
 
-def profile_plotting(profiles, legend, title, labels, line, log_scale):
+def profile_plotting(profiles, legend, title, labels, line, log_scale, max_points=None):
+    # max_points : maximum number of points plotted per curve (see decimation.py)
+    plt = pyplot()
+    profiles = decimate_profiles(profiles, max_points, log_x=log_scale)
     for i, profile in enumerate(profiles):
         plt.plot(profile[0], profile[1], line[i], label=legend[i])
     plt.title(title)
@@ -137,7 +267,8 @@ def profile_plot6(profiles): # Zagarola Smits scaling (u-u_e)/(u_e ẟ*/ẟ)=g(y
 #############################################################################
 
 def plotting_beta(profiles, x):
-    beta = [profile.beta() for profile in profiles]
+    plt = pyplot()
+    beta = TBL_properties(profiles, x)["beta"]
     plt.scatter(x, beta)
     plt.title("Clauser's pressure gradient parameter : β")
     plt.xlabel("x [m]")
@@ -145,7 +276,8 @@ def plotting_beta(profiles, x):
     plt.show()
 
 def plotting_p_plus(profiles, x):
-    p_plus = [profile.p_plus() for profile in profiles]
+    plt = pyplot()
+    p_plus = TBL_properties(profiles, x)["p_plus"]
     plt.scatter(x, p_plus)
     plt.title("Pressure gradient parameter : p+")
     plt.xlabel("x [m]")
@@ -153,29 +285,45 @@ def plotting_p_plus(profiles, x):
     plt.show()
 
 def plotting_K(profiles, x):
-    K = [profile.launder_acceleration_parameter() for profile in profiles]
+    plt = pyplot()
+    K = TBL_properties(profiles, x)["K"]
     plt.scatter(x, K)
     plt.title("Launder's acceleration parameter : K")
     plt.xlabel("x [m]")
     plt.ylabel("K")
     plt.show()
 
+def plotting_momentum_balance(profiles, x, smoothing=None):
+    plt = pyplot()
+    residual = streamwise_properties(profiles, x, smoothing)["relative_residual"]
+    plt.scatter(x, residual)
+    plt.title("von Kármán momentum integral residual")
+    plt.xlabel("x [m]")
+    plt.ylabel("residual / (C_f/2)")
+    plt.show()
+
 #############################################################################
 ############################## TBL properties ###############################
 #############################################################################
 
+def TBL_properties(profiles, x):
+    # Dictionary of the TBL properties arrays (one value per station)
+    # computed in one pass for a ProfileSet, station by station for a list of "bl_profile"
+    if hasattr(profiles, "properties"):
+        return profiles.properties()
+    properties = {"x": np.asarray(x, dtype=float)}
+    methods = {"u_e": "u_e", "Re_x": "reynolds_x", "Re_tau": "friction_reynolds",
+               "Re_theta": "momentum_thickness_reynolds", "delta": "boundary_thickness",
+               "delta_star": "displacement_thickness", "theta": "momentum_thickness",
+               "H": "shape_factor", "Delta": "clauser_rotta_thickness", "beta": "beta",
+               "p_plus": "p_plus", "K": "launder_acceleration_parameter"}
+    for name, method in methods.items():
+        properties[name] = np.array([getattr(profile, method)() for profile in profiles])
+    return properties
+
+
 def print_TBL_properties(profiles, x):
+    p = TBL_properties(profiles, x)
     print("x [m] u_e [m/s]  Re_x \t\t Re_τ \t\t Re_θ \t\t ẟ \t ẟ* \t θ \t H \t β \t p+ \t\t  K")
-    for i, profile in enumerate(profiles):
-        Re_x = profile.reynolds_x()
-        Re_tau = profile.friction_reynolds()
-        Re_theta = profile.momentum_thickness_reynolds()
-        beta = profile.beta()
-        p_plus = profile.p_plus()
-        K = profile.launder_acceleration_parameter()
-        delta = profile.boundary_thickness()
-        theta = profile.momentum_thickness()
-        delta_star = profile.displacement_thickness()
-        H = profile.shape_factor()
-        ue = profile.u_e()
-        print(f"{x[i]:.2f} \t {ue:.1f} \t {Re_x:.2e} \t {Re_tau:.2e} \t {Re_theta:.2e} \t {delta:.3f} \t {delta_star:.3f} \t {theta:.3f} \t {H:.3f} \t {beta:.1f} \t {p_plus:.5f} \t {K:.3e}")
\ No newline at end of file
+    for i in range(len(x)):
+        print(f"{x[i]:.2f} \t {p['u_e'][i]:.1f} \t {p['Re_x'][i]:.2e} \t {p['Re_tau'][i]:.2e} \t {p['Re_theta'][i]:.2e} \t {p['delta'][i]:.3f} \t {p['delta_star'][i]:.3f} \t {p['theta'][i]:.3f} \t {p['H'][i]:.3f} \t {p['beta'][i]:.1f} \t {p['p_plus'][i]:.5f} \t {p['K'][i]:.3e}")
\ No newline at end of file
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Stage level instrumentation of the post processing :
+    each stage of the pipeline (file read, parse, wall data interpolation, bl_profile construction,
+    TBL properties, each figure) is wrapped in "with instrumentation.stage(name):"
+    and, when the instrumentation is enabled, its wall time, number of calls and peak memory
+    (tracemalloc, memory allocated above the memory at the start of the stage) are recorded
+
+    The instrumentation is disabled by default and costs almost nothing then
+    The report is a dictionary (or a JSON file) :
+        {"total_time": ..., "stages": {name: {"time": ..., "calls": ..., "peak": ...}}, ...}
+
+    The main objects are :
+        instrumentation : instance used by all the modules
+        Instrumentation.stage : context manager timing one stage
+        Instrumentation.write_report : write the JSON report of the run
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+import numpy as np
+
+class Instrumentation:
+
+    def __init__(self, enabled=False):
+        self.stages = {} # name : {"time", "calls", "peak"}
+        self.stack = [] # [memory at the start, peak seen in the sub stages] of the running stages
+        self.start = time.perf_counter()
+        self.enabled = False
+        self.enable(enabled)
+
+    def enable(self, enabled=True):
+        # enable (and reset) or disable the instrumentation
+        self.enabled = enabled
+        if enabled:
+            self.stages.clear()
+            self.start = time.perf_counter()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        memory = tracemalloc.get_traced_memory()
+        if self.stack: # the peak of the running stage must not be lost
+            self.stack[-1][1] = max(self.stack[-1][1], memory[1])
+        tracemalloc.reset_peak()
+        self.stack.append([memory[0], 0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            memory, sub_peak = self.stack.pop()
+            peak = max(peak, sub_peak)
+            if self.stack:
+                self.stack[-1][1] = max(self.stack[-1][1], peak)
+            self.record(name, duration, 1, peak - memory)
+
+    def record(self, name, duration, calls, peak):
+        stage = self.stages.setdefault(name, {"time": 0.0, "calls": 0, "peak": 0})
+        stage["time"] += duration
+        stage["calls"] += calls
+        stage["peak"] = max(stage["peak"], peak)
+
+    def merge(self, stages):
+        # add the stages recorded by another instrumentation (e.g. in another process)
+        for name, stage in stages.items():
+            self.record(name, stage["time"], stage["calls"], stage["peak"])
+
+    def report(self):
+        report = {"total_time": time.perf_counter() - self.start,
+                  "python": sys.version.split()[0], "numpy": np.__version__, "stages": self.stages}
+        try:
+            import resource
+            report["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+        except ImportError:
+            pass
+        return report
+
+    def write_report(self, filename):
+        with open(filename, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+
+instrumentation = Instrumentation()
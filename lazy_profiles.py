@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy loading of the velocity profiles file :
+    when the file is opened, only the byte offsets of the "xy/key/label "x_..."" blocks are indexed
+    (regular expression search on a memory map of the file, nothing is parsed)
+    and a station is parsed only when it is accessed (then kept in memory)
+
+    LazyProfiles behaves like the dictionary returned by readXcste (functions.py) :
+        profiles[x] : array [y, u] of the station labelled x
+        profiles.station(i) : array [y, u] of the i-th station of the file
+        list(profiles) : labels of the stations (in file order), nothing is parsed
+
+    select_stations gives the stations in a range of x and/or one station every stride,
+    so that only these stations are parsed (e.g. for a quick look at a large export)
+    It is used without the cache, and with the cache (default) when stations are chosen and the cache
+    is not written yet (cached_readXcste with lazy=True, see file_cache.py)
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import mmap
+import re
+from collections.abc import Mapping
+import numpy as np
+from functions import XY_LABEL, parse_block
+from instrumentation import instrumentation
+
+XY_LABEL_BYTES = re.compile(XY_LABEL.pattern.encode()) # functions.XY_LABEL on the bytes of the memory map
+
+def index_blocks(filename, label=XY_LABEL_BYTES):
+    # Return the labels and the (start, end) byte offsets of the numeric block of each group
+    labels, blocks = [], []
+    with instrumentation.stage("index"):
+        with open(filename, 'rb') as file:
+            if not file.seek(0, 2): # empty file (cannot be memory mapped)
+                return labels, blocks
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as memory:
+                for match in label.finditer(memory):
+                    end = memory.find(b')', match.end())
+                    if end < 0:
+                        break
+                    labels.append(match.group(1).decode())
+                    blocks.append((match.end(), end))
+    return labels, blocks
+
+
+class LazyProfiles(Mapping):
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.labels, self.blocks = index_blocks(filename)
+        self.keys_list = [float(label) for label in self.labels]
+        self.index = {key: i for i, key in enumerate(self.keys_list)}
+        self.parsed = {} # stations already parsed
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __iter__(self):
+        return iter(self.keys_list)
+
+    def __getitem__(self, key): # [y, u] of the station labelled key
+        return self.station(self.index[key])
+
+    def station(self, i): # [y, u] of the i-th station of the file
+        if i not in self.parsed:
+            start, end = self.blocks[i]
+            with open(self.filename, 'rb') as file:
+                file.seek(start)
+                block = file.read(end - start)
+            values = parse_block(block.decode(), self.filename, self.labels[i])
+            self.parsed[i] = np.array([values[:, 0], values[:, 1]]) # as readXcste
+        return self.parsed[i]
+
+
+def select_stations(x, x_range=None, stride=1):
+    # indices of the stations with x in x_range = (x_min, x_max) (None : all), one station every stride
+    x = np.asarray(x, dtype=float)
+    selected = np.arange(len(x))
+    if x_range is not None:
+        x_min, x_max = x_range
+        selected = selected[(x >= (-np.inf if x_min is None else x_min)) & (x <= (np.inf if x_max is None else x_max))]
+    return list(selected[::stride])
@@ -38,13 +38,46 @@ dir = "data/"
 profiles_file = "profiles"
 # # Shear stress file
 tau_file = "shear-stress"
+# # Wall shear stress source : "wall" (shear stress file) or "clauser" (log law fit of each profile, Clauser chart)
+# # with "clauser" the shear stress file is not read
+tau_source = "wall"
 # # Pressure gradient file
 gradp_file = "dp_dx"
+# # Other variables exported on the same lines as the profiles (k, Reynolds stresses, temperature...) : {name: file}
+# # (None : velocity only), available in profile_set.fields and in the "bl_profile" of each station (profile.fields)
+variable_files = None # e.g. {"k": "profiles-k", "uv": "profiles-uv"}
+# # Keep a binary cache of the parsed files next to them (reloaded when the files did not change)
+use_cache = True
 
 
 # Profiles' x coordinates (m) : must be in increasing order
 x = [1, 2, 3, 4, 4.5, 5, 5.5, 5.7, 6, 6.2, 6.5, 6.7]
 
+# Stations to post process among the x above : x range (x_min, x_max) (None : all) and one station every stride
+# # only the chosen stations of the profiles file are parsed (without the cache or before it is written)
+station_range = None # e.g. (4, 6)
+station_stride = 1
+
+# Full field mode : profiles sliced from a 2D field export (x, y, u of the nodes near the wall) instead of the profiles file
+# # field file in the results directory (None : profiles file), ASCII with a header line, .npy or .bin (see field.py)
+field_file = None # e.g. "field.csv"
+# # number of stations evenly spaced in x (or list of x coordinates), they replace x
+field_stations = 200
+# # None : closest mesh column to each station, otherwise nodes at |x - station| <= field_tolerance (m)
+field_tolerance = None
+
+# Boundary layer edge ẟ :
+# # "fraction" : u = edge_fraction*u_e, "max_u" : maximum of u, "vorticity" : |du/dy| < edge_threshold*max|du/dy|
+edge_method = "fraction"
+edge_fraction = 0.99
+edge_threshold = 1e-3
+# # interpolate ẟ between the mesh nodes (False : ẟ is the y of a mesh node)
+edge_interpolation = True
+# # integration of ẟ*, θ and Δ : "trapezoid" or "simpson" (more accurate on coarse grids)
+integration_method = "trapezoid"
+# # storage of the profiles : "float64" or "float32" (half the memory for large cases, integrals still in float64)
+profile_dtype = "float64"
+
 #####################################################################################
 ################################## Post processing ##################################
 #####################################################################################
@@ -102,9 +135,49 @@ plot_beta = True
 plot_K = False
 # # plot Mellor's pressure gradient parameter p+ = f(x)
 plot_p_plus = False
+# # plot the residual of the von Kármán momentum integral equation dθ/dx + (2+H) θ/u_e du_e/dx = C_f/2
+# # (normalised by C_f/2, close to 0 for a converged 2D boundary layer) = f(x)
+plot_momentum_balance = False
+# # smoothing of θ, ẟ* and u_e before the x derivatives : None or number of neighbour stations on each side
+streamwise_smoothing = None
+
+#       Maximum number of points plotted per profile curve (None : all the points)
+# # the curves are decimated keeping their shape (see decimation.py), which keeps large meshes fast to plot
+plot_max_points = None
 
 #       Print turbulent boundary layer properties at different x coordinates
 print_properties = True
+#       Print the collapse score of each scaling of the profiles (spread between the stations, see collapse.py)
+print_collapse = False
+
+#       Export the properties and the scaled profiles to files (None : no export)
+# # format from the extension : .csv, .npz, .parquet or .arrow (parquet and arrow require pyarrow)
+properties_export = None # e.g. "TBL_properties.csv"
+profiles_export = None # e.g. "profiles.parquet"
+
+#       Add the properties and the scaled profiles (store_points per station) to a results store of many cases
+# # (directory, see store.py) under the name case_name (None : name of the results directory)
+results_store = None # e.g. "results_store"
+case_name = None
+store_points = 100
+
+#                       Export figures to files instead of plotting
+"""
+If figures_directory is not None, the chosen profiles and curves are not shown
+but saved in this directory (one file per figure and format : png, svg or pdf)
+The figures are rendered without window, in parallel processes (figures_workers = None : number of CPUs)
+"""
+figures_directory = None
+figures_formats = ["png"]
+figures_workers = None
+
+#                       Timing and memory report of the run
+"""
+If instrumentation_report is not None, the time, number of calls and peak memory of each stage
+(file read, parse, wall data interpolation, bl_profile construction, TBL properties, each exported figure)
+are written to this JSON file
+"""
+instrumentation_report = None
 
 #####################################################################################
 ########################### Launch Post processing tool #############################
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Library API and command line interface of the post processing tool :
+    the inputs of main.py are given in a TOML or JSON file (same names, the missing ones take
+    the values of DEFAULT_CONFIG) and the post processing runs without window :
+        the TBL properties are computed, printed and exported
+        the figures are exported to figures_directory if it is given (matplotlib is only imported then)
+
+    Example of config.toml :
+        dir = "data/"
+        x = [1, 2, 3, 4, 4.5, 5, 5.5, 5.7, 6, 6.2, 6.5, 6.7]
+        properties_export = "TBL_properties.csv"
+
+    The main functions are :
+        load_config : read a TOML or JSON config file
+        compute : read the Fluent files and return x and the ProfileSet
+        run : compute, print, export (and figures) as in postprocessing.py
+
+Usage :
+    python pipeline.py config.toml
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import argparse
+import json
+import os
+import sys
+import numpy as np
+from profile_set import ProfileSet
+from functions import readXY, readWallData, readVariables, print_TBL_properties
+from file_cache import cached_readXcste, cached_readXY
+from lazy_profiles import LazyProfiles, select_stations
+from field import field_profiles
+from export import export_properties, export_profiles
+from collapse import collapse, print_collapse
+from store import ResultsStore
+from instrumentation import instrumentation
+
+# inputs of main.py and their default values
+DEFAULT_CONFIG = {
+    "dir": "data/", "profiles_file": "profiles", "tau_file": "shear-stress", "tau_source": "wall",
+    "gradp_file": "dp_dx", "variable_files": None, "use_cache": True, "x": None,
+    "station_range": None, "station_stride": 1,
+    "field_file": None, "field_stations": 200, "field_tolerance": None,
+    "edge_method": "fraction", "edge_fraction": 0.99, "edge_threshold": 1e-3, "edge_interpolation": True,
+    "integration_method": "trapezoid", "profile_dtype": "float64",
+    "plot_profiles_0": False, "plot_profiles_1": False, "plot_profiles_2": False, "plot_profiles_3": False,
+    "plot_profiles_4": False, "plot_profiles_5": False, "plot_profiles_6": False,
+    "plot_log_law": True, "plot_sub_layer": True,
+    "legend_0": "Re_x", "legend_1": "Re_x", "legend_2": "p_plus", "legend_3": "beta",
+    "legend_4": "Re_theta", "legend_5": "Re_x", "legend_6": "Re_x",
+    "title_0": "Velocity profiles", "title_1": "Velocity profiles", "title_2": "Velocity profiles",
+    "title_3": "Velocity profiles", "title_4": "Velocity profiles", "title_5": "Velocity profiles",
+    "title_6": "Velocity profiles",
+    "plot_beta": False, "plot_K": False, "plot_p_plus": False, "plot_momentum_balance": False,
+    "streamwise_smoothing": None, "plot_max_points": None,
+    "print_properties": True, "print_collapse": False, "properties_export": None, "profiles_export": None,
+    "results_store": None, "case_name": None, "store_points": 100,
+    "figures_directory": None, "figures_formats": ["png"], "figures_workers": None,
+    "instrumentation_report": None,
+}
+
+def load_config(filename):
+    # Read a TOML (.toml) or JSON config file and complete it with DEFAULT_CONFIG
+    if filename.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError: # python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError("tomli is required to read TOML files with python < 3.11 (pip install tomli)")
+        with open(filename, 'rb') as file:
+            config = tomllib.load(file)
+    else:
+        with open(filename, 'r') as file:
+            config = json.load(file)
+    unknown = set(config) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"{filename}: unknown inputs {', '.join(sorted(unknown))}")
+    return {**DEFAULT_CONFIG, **config}
+
+
+def compute(config, verbose=False):
+    # Read the Fluent files (or the field) of config and return x and the ProfileSet of the stations
+    config = {**DEFAULT_CONFIG, **config}
+    dir, x = config["dir"], config["x"]
+    read_wall = cached_readXY if config["use_cache"] else readXY
+    fields = None # other variables of the stations (variable_files)
+    selection = config["station_range"] is not None or config["station_stride"] != 1
+    # Read profiles file (from the binary cache if the file did not change)
+    if config["field_file"]:
+        x, profiles = field_profiles(dir + config["field_file"], config["field_stations"], config["field_tolerance"],
+                                     use_cache=config["use_cache"])
+        profiles_dict = dict(zip(x, profiles))
+        if verbose:
+            print(f"\t\t {len(x)} profiles sliced from the field {config['field_file']}")
+    elif config["variable_files"]:
+        # velocity and the other variables, one pass per file
+        variables = config["variable_files"]
+        stations = readVariables([dir + config["profiles_file"]] + [dir + variables[name] for name in variables],
+                                 [["u"]] + [[name] for name in variables])
+        profiles_dict = {label: [station["y"], station["u"]] for label, station in stations.items()}
+        fields = [{name: station[name] for name in variables} for station in stations.values()]
+        if verbose:
+            print(f"\t\t Variables {', '.join(variables)} imported with the velocity profiles")
+    elif config["use_cache"]:
+        # without a valid cache, only the chosen stations are parsed
+        profiles_dict = cached_readXcste(dir + config["profiles_file"], dir, lazy=selection)
+    else:
+        profiles_dict = LazyProfiles(dir + config["profiles_file"]) # stations parsed when they are used
+    if x is None or len(profiles_dict) != len(x):
+        raise ValueError("number of profiles imported is not the same as the number of x")
+    # chosen stations
+    if selection:
+        selected = select_stations(x, config["station_range"], config["station_stride"])
+        labels = list(profiles_dict)
+        x = [x[i] for i in selected]
+        profiles_dict = {labels[i]: profiles_dict[labels[i]] for i in selected}
+        if fields is not None:
+            fields = [fields[i] for i in selected]
+        if verbose:
+            print(f"\t\t {len(x)} stations chosen")
+
+    # wall shear stress and pressure gradient lists (read and interpolated together)
+    if config["tau_source"] == "clauser":
+        wall_data = readWallData([dir + config["gradp_file"]], x, ["gradp"], read_wall)
+        wall_data["tau_w"] = np.full(len(x), np.nan) # replaced by the Clauser chart fit
+    else:
+        wall_data = readWallData([dir + config["tau_file"], dir + config["gradp_file"]], x, ["tau_w", "gradp"], read_wall)
+    if verbose:
+        print("\t\t\t Fluent files imported and read")
+
+    # velocity profiles
+    profile_set = ProfileSet(list(profiles_dict.values()), wall_data["tau_w"], wall_data["gradp"], x,
+                             config["edge_method"], config["edge_fraction"], config["edge_threshold"],
+                             config["edge_interpolation"], config["integration_method"], fields,
+                             config["profile_dtype"])
+    if config["tau_source"] == "clauser":
+        profile_set.use_clauser_tau() # u_τ from the log law fit of each profile
+        if verbose:
+            print("\t   Wall shear stress estimated with the Clauser chart")
+    if verbose:
+        print("\t   Velocity profiles created with the class \"ProfileSet\"")
+    return x, profile_set
+
+
+def export_results(profile_set, x, config, verbose=False):
+    # Print and export the TBL properties (and the collapse scores) and the scaled profiles,
+    # add them to the results store
+    if config["print_properties"]:
+        print_TBL_properties(profile_set, x)
+    if config["print_collapse"]:
+        print("\n\t\t Self similarity of the scaled profiles:\n")
+        print_collapse(collapse(profile_set))
+    if config["properties_export"]:
+        export_properties(profile_set, x, config["properties_export"])
+        if verbose:
+            print(f"\n\t\t TBL properties exported to {config['properties_export']}")
+    if config["profiles_export"]:
+        export_profiles(profile_set, config["profiles_export"])
+        if verbose:
+            print(f"\n\t\t Scaled profiles exported to {config['profiles_export']}")
+    if config["results_store"]:
+        case = config["case_name"] or os.path.basename(os.path.normpath(config["dir"]))
+        ResultsStore(config["results_store"]).append(case, profile_set, config["store_points"])
+        if verbose:
+            print(f"\n\t\t Case {case} added to the results store {config['results_store']}")
+
+
+def export_figure_files(profile_set, x, config):
+    # Export the chosen figures to config["figures_directory"] (matplotlib is imported here only)
+    from figures import FIGURE_NAMES, figure_specs, export_figures
+    flags = [config[f"plot_profiles_{i}"] for i in range(7)] + [config["plot_beta"], config["plot_p_plus"],
+                                                              config["plot_K"], config["plot_momentum_balance"]]
+    names = [name for name, flag in zip(FIGURE_NAMES, flags) if flag]
+    legends = {name: config[f"legend_{i}"] for i, name in enumerate(FIGURE_NAMES[:7])}
+    titles = {name: config[f"title_{i}"] for i, name in enumerate(FIGURE_NAMES[:7])}
+    specs = figure_specs(profile_set, x, names, legends, titles, config["plot_log_law"], config["plot_sub_layer"],
+                         config["streamwise_smoothing"], config["plot_max_points"])
+    return export_figures(specs, config["figures_directory"], config["figures_formats"], config["figures_workers"])
+
+
+def run(config, verbose=True):
+    # Headless post processing of config (dictionary or config file name), return the ProfileSet
+    if isinstance(config, str):
+        config = load_config(config)
+    config = {**DEFAULT_CONFIG, **config}
+    instrumentation.enable(bool(config["instrumentation_report"]))
+    x, profile_set = compute(config, verbose)
+    export_results(profile_set, x, config, verbose)
+    if config["figures_directory"]:
+        files = export_figure_files(profile_set, x, config)
+        if verbose:
+            print(f"\n\t\t {len(files)} figure files exported to {config['figures_directory']}")
+    if config["instrumentation_report"]:
+        instrumentation.write_report(config["instrumentation_report"])
+        if verbose:
+            print(f"\n\t\t Timing report written to {config['instrumentation_report']}")
+    return profile_set
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless post processing of turbulent boundary layer profiles from Fluent")
+    parser.add_argument("config", help="TOML or JSON file with the inputs of main.py")
+    parser.add_argument("--quiet", action="store_true", help="do not print the progress messages")
+    args = parser.parse_args(argv)
+    try:
+        run(args.config, not args.quiet)
+    except (OSError, ValueError) as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
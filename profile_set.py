@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Set of boundary layer profiles :
+    all the stations of a case are stored in a single ragged array
+    (flat y and u arrays sorted station by station plus the offsets of each station)
+    and the TBL properties are computed for every station at once with numpy
+
+    The class takes as input :
+        profiles : a list of [y, u] pairs (one per station)
+        tau : shear stress at each x
+        gradp : pressure gradient at each x
+        x : x coordinates of the stations
+        fields (optional) : one dictionary per station of other variables on the same y (see readVariables),
+                            stored as flat arrays like u (ProfileSet.fields) and given to the "bl_profile" of each station
+        dtype (optional) : storage type of y, u and the fields, float64 (default) or float32 (half the memory,
+                           the integrals are still accumulated in float64)
+
+    y, u and the fields are read only views of one contiguous array (ProfileSet.data, one line per variable),
+    filled once from the profiles and sorted by y only if a station is not already sorted,
+    the "bl_profile" of each station holds views of it (no copy)
+    The only other array kept per point is the station index (int32), the integration weights
+    are recomputed when they are used
+
+    The properties are numpy arrays with one value per station :
+        u_e, utau, delta (ẟ), delta_star (ẟ*), theta (θ), H, Delta (Δ),
+        Re_x, Re_tau, Re_theta, beta, p_plus, K
+
+    The fluid properties and the log law constants are the ones of the class "bl_profile"
+    The edge definition (see edge.py) and the integration method (see quadrature.py)
+    default to the ones of the class "bl_profile"
+    ẟ* and θ are integrated together with weights computed for all the stations at once (see quadrature.py)
+    use_clauser_tau replaces tau by the shear stress rho u_τ² of the Clauser chart fit (see clauser.py)
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import numpy as np
+from boundary_layer import bl_profile
+from edge import boundary_layer_edge
+from quadrature import integration_weights, integrate
+from clauser import clauser_fit
+from instrumentation import instrumentation
+
+class ProfileSet:
+    mu = bl_profile.mu
+    rho = bl_profile.rho
+    nu = bl_profile.nu
+    k = bl_profile.k
+    b = bl_profile.b
+
+    def __init__(self, profiles, tau, gradp, x, edge_method=None, edge_fraction=None,
+                 edge_threshold=None, edge_interpolation=None, integration=None, fields=None, dtype=None):
+        with instrumentation.stage("ProfileSet construction"):
+            lengths = np.array([len(profile[0]) for profile in profiles])
+            self.offsets = np.concatenate(([0], np.cumsum(lengths))) # start of each station in y, u
+            # station of each point (int32 : 4 bytes per point)
+            self.station = np.repeat(np.arange(len(lengths), dtype=np.int32), lengths)
+            names = list(fields[0]) if fields else []
+            # one line per variable (y, u, fields), each station copied once in its columns
+            data = np.empty((2 + len(names), self.offsets[-1]), dtype=float if dtype is None else dtype)
+            for i, profile in enumerate(profiles):
+                start, end = self.offsets[i], self.offsets[i + 1]
+                data[0, start:end], data[1, start:end] = profile[0], profile[1]
+                for line, name in enumerate(names, 2):
+                    data[line, start:end] = fields[i][name]
+            # sort each station by y (only if it is not already sorted)
+            decreasing = (np.diff(data[0]) < 0) & (self.station[1:] == self.station[:-1])
+            if np.any(decreasing):
+                data = data[:, np.lexsort((data[0], self.station))]
+            data.flags.writeable = False
+            self.data = data
+            self.y, self.u = data[0], data[1]
+            self.fields = {name: data[line] for line, name in enumerate(names, 2)}
+        self.tau = np.asarray(tau, dtype=float)
+        self.gradp = np.asarray(gradp, dtype=float)
+        self.x = np.asarray(x, dtype=float)
+        # boundary layer edge definition
+        self.edge_method = bl_profile.edge_method if edge_method is None else edge_method
+        self.edge_fraction = bl_profile.edge_fraction if edge_fraction is None else edge_fraction
+        self.edge_threshold = bl_profile.edge_threshold if edge_threshold is None else edge_threshold
+        self.edge_interpolation = bl_profile.edge_interpolation if edge_interpolation is None else edge_interpolation
+        self.integration = bl_profile.integration if integration is None else integration
+        self.compute()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i): # bl_profile of station i (views of the set, with the batched values cached)
+        # a new object at each call : the set does not keep the stations in memory
+        i = range(len(self))[i] # negative index, IndexError out of range
+        with instrumentation.stage("bl_profile construction"):
+            y, u = self.station_data(i)
+            start, end = self.offsets[i], self.offsets[i + 1]
+            profile = bl_profile([y, u], self.tau[i], self.gradp[i], self.x[i],
+                                 {name: values[start:end] for name, values in self.fields.items()})
+            profile._cache.update(edge=(int(self.bl_index[i] - self.offsets[i]), self.delta[i], self.u_e[i]),
+                                  utau=self.utau[i],
+                                  displacement_thickness=self.delta_star[i],
+                                  momentum_thickness=self.theta[i], clauser_rotta_thickness=self.Delta[i])
+        return profile
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def station_data(self, i): # y, u arrays of station i
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.y[start:end], self.u[start:end]
+
+    @property
+    def weights(self): # integration weights from the wall to ẟ (computed when used, not kept in memory)
+        return integration_weights(self.y, self.offsets, self.delta, self.integration)
+
+    def integral(self, f): # integral of f (or of each line of f) over each station from the wall to ẟ
+        return integrate(f, self.weights, self.offsets)
+
+    def compute(self): # compute all the TBL properties in one pass
+        with instrumentation.stage("TBL properties"):
+            # boundary layer edge of each station : first point at or above ẟ, ẟ and u_e
+            self.bl_index, self.delta, self.u_e = boundary_layer_edge(self.y, self.u, self.offsets, self.edge_method,
+                                                                      self.edge_fraction, self.edge_threshold,
+                                                                      self.edge_interpolation)
+            self.utau = np.sqrt(self.tau / self.rho) # friction velocity u_τ
+            v_frac = self.u / self.u_e[self.station]
+            self.delta_star, self.theta = self.integral(np.stack((1 - v_frac, v_frac * (1 - v_frac)))) # ẟ*, θ
+            self.H = self.delta_star / self.theta # shape factor
+            self.Delta = self.u_e * self.delta_star / self.utau # Δ
+            self.Re_x = self.u_e * self.x / self.nu
+            self.Re_tau = self.delta * self.utau / self.nu
+            self.Re_theta = self.u_e * self.theta / self.nu
+            self.beta = self.gradp * self.delta_star / self.tau
+            self.p_plus = self.gradp * self.nu / self.utau**3
+            self.K = - self.nu * self.gradp / (self.rho * self.u_e**3)
+
+    def clauser_utau(self, **options): # u_τ of each station from the Clauser chart (options of clauser_fit)
+        # with fit_constants=True : (u_τ, k, B) of each station
+        return clauser_fit(self.y, self.u, self.offsets, self.delta, self.nu, self.k, self.b,
+                           u_e=self.u_e, **options)
+
+    def use_clauser_tau(self, **options): # replace tau by rho u_τ² of the Clauser chart and recompute
+        with instrumentation.stage("Clauser fit"):
+            utau = self.clauser_utau(**options)
+            if options.get("fit_constants"): # only u_τ is used
+                utau = utau[0]
+            self.tau = self.rho * utau**2
+        self.compute()
+
+    def properties(self): # dictionary of the TBL properties arrays
+        return {"x": self.x, "u_e": self.u_e, "Re_x": self.Re_x, "Re_tau": self.Re_tau,
+                "Re_theta": self.Re_theta, "delta": self.delta, "delta_star": self.delta_star,
+                "theta": self.theta, "H": self.H, "Delta": self.Delta, "beta": self.beta,
+                "p_plus": self.p_plus, "K": self.K}
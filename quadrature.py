@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Integration weights of the integral thicknesses (ẟ*, θ, Δ) :
+    the integral of f from the wall to ẟ of each station is written as a weighted sum Σ w f
+    the weights only depend on the y grid and on ẟ, so they are computed once for all the integrands
+    and for all the stations at once (flat arrays, O(number of points) in time and memory) :
+        the weights of the full cells (or Simpson pairs of cells) below the cell [y_j, y_j+1] containing ẟ
+        are summed on their nodes, then the part of the cell j below ẟ is added
+        (f linearly interpolated in this cell, as in edge.truncated_integral)
+
+    The methods are :
+        "trapezoid" : trapezoidal rule (same values as edge.truncated_integral)
+        "simpson" : Simpson's rule on pairs of cells (non uniform grid), trapezoid on the last cell if needed
+                    and on the cells of zero height (repeated y)
+                    the pairs fully below ẟ use Simpson's rule (exact for a quadratic f up to ẟ at a node),
+                    a pair containing ẟ inside it uses the trapezoid on its first cell and f linearly
+                    interpolated in the cell of ẟ : second order accuracy on this pair only
+
+    The stations are stored in flat y arrays sorted by station then by y,
+    offsets gives the start of each station (offsets = [0, len(y)] for a single profile)
+
+    The main functions are :
+        integration_weights : flat array of the weights of all the stations
+        integrate : integral of one or several integrands (stacked on the first axis) for each station
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import numpy as np
+from edge import stations
+
+INTEGRATION_METHODS = ("trapezoid", "simpson")
+
+def edge_cells(y, offsets, delta):
+    # cell [y_j, y_j+1] containing ẟ of each station (flat index j), fraction t of the cell below ẟ and height h
+    # (j = -1 for the stations with less than 2 points)
+    station = stations(offsets)
+    lengths = np.diff(offsets)
+    below = np.bincount(station, weights=y <= np.asarray(delta)[station], minlength=len(lengths)).astype(int)
+    j = np.where(lengths >= 2, offsets[:-1] + np.clip(below - 1, 0, lengths - 2), -1)
+    inside = j >= 0
+    t, h = np.zeros(len(j)), np.zeros(len(j))
+    h[inside] = y[j[inside] + 1] - y[j[inside]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t[inside] = np.clip(np.where(h[inside] > 0, (delta[inside] - y[j[inside]]) / h[inside], 0), 0, 1)
+    return j, t, h
+
+
+def simpson_pairs(h, cells):
+    # first cells of the Simpson pairs : consecutive cells of non zero height of a station are paired
+    # from the first one of each run (the last cell of a run of odd length uses the trapezoid)
+    positive = cells & (h > 0)
+    index = np.arange(len(h))
+    run_start = positive & ~np.r_[False, positive[:-1]]
+    position = index - np.maximum.accumulate(np.where(run_start, index, 0)) # position in the run
+    return positive & (position % 2 == 0) & np.r_[positive[1:], False]
+
+
+def integration_weights(y, offsets, delta, method="trapezoid"):
+    # flat weights of all the stations
+    if method not in INTEGRATION_METHODS:
+        raise ValueError(f"unknown integration method {method}, available methods : {', '.join(INTEGRATION_METHODS)}")
+    y = np.asarray(y, dtype=float) # weights in float64
+    offsets = np.asarray(offsets)
+    delta = np.asarray(delta, dtype=float)
+    weights = np.zeros(len(y))
+    if len(y) < 2:
+        return weights
+    station = stations(offsets)
+    j, t, h_edge = edge_cells(y, offsets, delta)
+    complete = t >= 1 # ẟ at the top node of its cell (e.g. last node) : the cell is a full cell
+    h = np.diff(y)
+    cells = station[1:] == station[:-1] # cells between two points of the same station
+    last = np.full(len(h), -1)
+    last[cells] = (j + complete)[station[:-1][cells]] # first cell of the station not fully below ẟ
+    index = np.arange(len(h))
+    trapezoid = cells & (index < last) # full cells below the edge cell
+    if method == "simpson":
+        first = simpson_pairs(h, cells)
+        second = np.r_[False, first[:-1]]
+        trapezoid &= ~first & ~second
+        # pairs below the edge cell
+        pairs = np.flatnonzero(first & (index + 1 < last))
+        h0, h1 = h[pairs], h[pairs + 1]
+        weights += np.bincount(pairs, weights=(h0 + h1) / 6 * (2 - h1 / h0), minlength=len(y))
+        weights += np.bincount(pairs + 1, weights=(h0 + h1)**3 / (6 * h0 * h1), minlength=len(y))
+        weights += np.bincount(pairs + 2, weights=(h0 + h1) / 6 * (2 - h0 / h1), minlength=len(y))
+        # ẟ in the second cell of a pair : trapezoid on the first cell
+        trapezoid |= first & (index + 1 == last)
+    full = np.flatnonzero(trapezoid)
+    weights += np.bincount(full, weights=h[full] / 2, minlength=len(y))
+    weights += np.bincount(full + 1, weights=h[full] / 2, minlength=len(y))
+    # part of the edge cell below ẟ
+    inside = (j >= 0) & ~complete
+    j, t, h_edge = j[inside], t[inside], h_edge[inside]
+    weights += np.bincount(j, weights=h_edge * t * (2 - t) / 2, minlength=len(y))
+    weights += np.bincount(j + 1, weights=h_edge * t**2 / 2, minlength=len(y))
+    return weights
+
+
+def integrate(f, weights, offsets):
+    # integral of f (shape (..., len(y))) for each station : Σ w f over each station (accumulated in float64)
+    return np.add.reduceat(np.asarray(f) * weights, np.asarray(offsets)[:-1], axis=-1, dtype=float)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Results store of many cases :
+    the TBL properties (one line per station) and the scaled profiles (decimated to a point budget
+    per station, see decimation.py) of each processed case are appended to a directory :
+        <store>/<chunk>/stations/<column>.npy : properties of the stations of one case
+        <store>/<chunk>/profiles/<column>.npy : scaled profiles of the same stations
+        <store>/manifest.jsonl : one line per chunk (case, number of stations and points,
+                                 minimum and maximum of each property column)
+    A chunk is written in a temporary directory and renamed, then its manifest line is appended :
+    nothing is ever rewritten, several processes can append to the same store (batch.py)
+    Appending a case again adds a new chunk, the queries use the last chunk of each case
+
+    Queries are given as ranges of the property columns (min, max), None for an open bound :
+        store.query(beta=(0.5, 2), Re_theta=(None, 3000))
+    the chunks whose min/max do not overlap the ranges are skipped using the manifest only,
+    the columns of the other chunks are memory mapped and only the columns used are read
+
+    The main objects are :
+        ResultsStore : append, cases, query (stations), profiles (scaled profiles of the stations found)
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import json
+import os
+import uuid
+import numpy as np
+from export import PROFILE_COLUMNS, flat_scaled_profiles
+from decimation import lttb
+
+class ResultsStore:
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest = os.path.join(directory, "manifest.jsonl")
+        os.makedirs(directory, exist_ok=True)
+
+    def chunks(self, case=None, latest=True): # manifest lines of the chunks (of a case or list of cases)
+        entries = []
+        if os.path.isfile(self.manifest):
+            with open(self.manifest, 'r') as file:
+                entries = [json.loads(line) for line in file if line.strip()]
+        if latest:
+            entries = list({entry["case"]: entry for entry in entries}.values())
+        if case is not None:
+            cases = [case] if isinstance(case, str) else list(case)
+            entries = [entry for entry in entries if entry["case"] in cases]
+        return entries
+
+    def cases(self): # names of the cases in the store
+        return [entry["case"] for entry in self.chunks()]
+
+    def append(self, case, profiles, points=100):
+        # Add the properties and the scaled profiles (points per station, None : all) of a ProfileSet
+        properties = {"station": np.arange(len(profiles)), **profiles.properties()}
+        # points kept in each station (u+ = f(y+) decimated), then the scaled columns of these points only
+        kept = None
+        if points:
+            kept = []
+            for i in range(len(profiles)):
+                y, u = profiles.station_data(i)
+                utau = profiles.utau[i]
+                kept.append(profiles.offsets[i] + lttb(y * utau / profiles.nu, u / utau, points, log_x=True))
+            kept = np.concatenate(kept) if kept else np.zeros(0, dtype=int)
+        scaled = flat_scaled_profiles(profiles, kept)
+        chunk = uuid.uuid4().hex
+        path = os.path.join(self.directory, chunk)
+        temporary = path + ".tmp"
+        for table, columns in (("stations", properties), ("profiles", scaled)):
+            os.makedirs(os.path.join(temporary, table))
+            for name, values in columns.items():
+                np.save(os.path.join(temporary, table, name + ".npy"), np.asarray(values))
+        os.replace(temporary, path)
+        with np.errstate(invalid='ignore'):
+            ranges = {name: [float(np.nanmin(values)), float(np.nanmax(values))] if np.any(np.isfinite(values)) else None
+                      for name, values in properties.items()}
+        entry = {"chunk": chunk, "case": case, "stations": len(profiles), "points": len(scaled["x"]), "ranges": ranges}
+        with open(self.manifest, 'a') as file: # one write per line
+            file.write(json.dumps(entry) + "\n")
+        return chunk
+
+    def column(self, entry, table, name): # column of a chunk (memory mapped)
+        return np.load(os.path.join(self.directory, entry["chunk"], table, name + ".npy"), mmap_mode='r')
+
+    def matching(self, entry, ranges): # stations of a chunk in the ranges (None : chunk skipped)
+        for name, (low, high) in ranges.items():
+            bounds = entry["ranges"].get(name, False)
+            if bounds is False:
+                raise ValueError(f"unknown column {name}, available columns : {', '.join(entry['ranges'])}")
+            if bounds is None or (low is not None and bounds[1] < low) or (high is not None and bounds[0] > high):
+                return None
+        keep = np.ones(entry["stations"], dtype=bool)
+        for name, (low, high) in ranges.items():
+            values = self.column(entry, "stations", name)
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+        return np.flatnonzero(keep)
+
+    def query(self, columns=None, case=None, **ranges):
+        # Properties of the stations of all the cases (or case) in the ranges : {"case": ..., column: ...}
+        entries, found = [], []
+        for entry in self.chunks(case):
+            stations = self.matching(entry, ranges)
+            if stations is not None and len(stations):
+                entries.append(entry)
+                found.append(stations)
+        if not entries:
+            return {}
+        columns = columns or list(entries[0]["ranges"])
+        result = {"case": np.concatenate([np.full(len(stations), entry["case"]) for entry, stations in zip(entries, found)])}
+        for name in columns:
+            result[name] = np.concatenate([self.column(entry, "stations", name)[stations]
+                                           for entry, stations in zip(entries, found)])
+        return result
+
+    def profiles(self, columns=None, case=None, **ranges):
+        # Scaled profiles of the stations in the ranges : {"case": ..., "station": ..., column: ...} (one line per point)
+        columns = columns or ["x"] + list(PROFILE_COLUMNS)
+        parts = []
+        for entry in self.chunks(case):
+            stations = self.matching(entry, ranges)
+            if stations is None or not len(stations):
+                continue
+            station = self.column(entry, "profiles", "station")
+            points = np.flatnonzero(np.isin(station, stations))
+            part = {"case": np.full(len(points), entry["case"]), "station": station[points]}
+            for name in columns:
+                part[name] = self.column(entry, "profiles", name)[points]
+            parts.append(part)
+        if not parts:
+            return {}
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
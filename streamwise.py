@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Streamwise evolution of the boundary layer :
+    x derivatives of the station values and von Kármán momentum integral balance
+        dθ/dx + (2 + H) θ/u_e du_e/dx = C_f/2 = τ_w/(rho u_e²)
+    the residual dθ/dx + (2 + H) θ/u_e du_e/dx - C_f/2 is 0 for a converged, 2D, attached boundary layer
+
+    The derivatives are second order finite differences on the non uniform x grid (np.gradient),
+    computed for all the stations at once, the values can first be smoothed by a local linear least squares
+    fit on the 2*smoothing+1 closest stations (running sums, no loop over the stations)
+    du_e/dx is also given from the pressure gradient (Bernoulli outside the boundary layer : -dp/dx / (rho u_e))
+
+    The main functions are :
+        derivative : df/dx on a non uniform grid
+        smooth : local linear least squares smoothing
+        momentum_balance : dθ/dx, du_e/dx, C_f/2 and the residual of the von Kármán equation
+        streamwise_properties : momentum_balance of a ProfileSet or of a list of "bl_profile"
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import numpy as np
+from boundary_layer import bl_profile
+
+def derivative(f, x):
+    # df/dx on the non uniform grid x (second order, first order with 2 stations)
+    f, x = np.asarray(f, dtype=float), np.asarray(x, dtype=float)
+    if len(x) < 2:
+        return np.full(len(x), np.nan)
+    return np.gradient(f, x, edge_order=2 if len(x) > 2 else 1)
+
+
+def smooth(f, x, smoothing):
+    # value at each x of the least squares line through the 2*smoothing+1 closest stations (fewer at the ends)
+    f, x = np.asarray(f, dtype=float), np.asarray(x, dtype=float)
+    n = len(x)
+    start = np.clip(np.arange(n) - smoothing, 0, n)
+    end = np.clip(np.arange(n) + smoothing + 1, 0, n)
+    def window_sum(a): # sum of a over the window of each station
+        total = np.concatenate(([0], np.cumsum(a)))
+        return total[end] - total[start]
+    x0 = x - x.mean() # centred x (better conditioned sums)
+    count, sx, sf = end - start, window_sum(x0), window_sum(f)
+    sxx, sxf = window_sum(x0**2), window_sum(x0 * f)
+    variance = count * sxx - sx**2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(variance > 0, (count * sxf - sx * sf) / variance, 0)
+    return (sf - slope * sx) / count + slope * x0
+
+
+def momentum_balance(x, theta, delta_star, u_e, tau, gradp=None, rho=bl_profile.rho, smoothing=None):
+    # Return a dictionary of arrays (one value per station) :
+    #   dtheta_dx, due_dx, due_dx_pressure (if gradp is given), cf_half = C_f/2, residual and
+    #   relative_residual = residual/(C_f/2) of the von Kármán momentum integral equation
+    x = np.asarray(x, dtype=float)
+    theta, delta_star, u_e, tau = (np.asarray(a, dtype=float) for a in (theta, delta_star, u_e, tau))
+    if smoothing:
+        theta, delta_star, u_e = (smooth(a, x, smoothing) for a in (theta, delta_star, u_e))
+    H = delta_star / theta
+    result = {"x": x, "dtheta_dx": derivative(theta, x), "due_dx": derivative(u_e, x),
+              "cf_half": tau / (rho * u_e**2)}
+    if gradp is not None:
+        result["due_dx_pressure"] = - np.asarray(gradp, dtype=float) / (rho * u_e)
+    result["residual"] = result["dtheta_dx"] + (2 + H) * theta / u_e * result["due_dx"] - result["cf_half"]
+    result["relative_residual"] = result["residual"] / result["cf_half"]
+    return result
+
+
+def streamwise_properties(profiles, x, smoothing=None):
+    # momentum_balance of a ProfileSet or of a list of "bl_profile"
+    if hasattr(profiles, "properties"):
+        theta, delta_star, u_e = profiles.theta, profiles.delta_star, profiles.u_e
+        tau, gradp = profiles.tau, profiles.gradp
+    else:
+        theta = [profile.momentum_thickness() for profile in profiles]
+        delta_star = [profile.displacement_thickness() for profile in profiles]
+        u_e = [profile.u_e() for profile in profiles]
+        tau = [profile.tau for profile in profiles]
+        gradp = [profile.gradp for profile in profiles]
+    return momentum_balance(x, theta, delta_star, u_e, tau, gradp, getattr(profiles, "rho", bl_profile.rho), smoothing)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Parameter sweep of the TBL properties :
+    the TBL properties of all the stations are computed for arrays of
+        edge : edge parameter (edge_fraction of the "fraction" edge, edge_threshold of the "vorticity" edge)
+        mu, rho : fluid properties
+        k, b : log law constants (they change u_τ only with the Clauser chart, tau_source = "clauser")
+    in one call, the result has one axis per parameter and one axis for the stations :
+        (edge, mu, rho, k, b, station)
+
+    The edge, ẟ* and θ are computed once per edge value (all the stations at once),
+    the other properties are obtained by numpy broadcasting over the fluid and log law axes
+    (the properties that do not depend on a parameter have a size 1 axis, broadcast without copy)
+    With the Clauser chart, u_τ of all the parameter combinations is fitted in one call of clauser_fit
+
+    The main objects are :
+        sweep : TBL properties for arrays of parameters
+        SweepResult : labelled result, result["H"], result.sel(edge=0.99, mu=1.7894e-5), result.to_xarray()
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import numpy as np
+from profile_set import ProfileSet
+from edge import boundary_layer_edge
+from quadrature import integration_weights, integrate
+from clauser import clauser_fit
+
+DIMS = ("edge", "mu", "rho", "k", "b", "station")
+
+class SweepResult:
+
+    def __init__(self, coords, data):
+        self.dims = DIMS
+        self.coords = coords # dimension : values
+        self.shape = tuple(len(coords[dim]) for dim in DIMS)
+        self.data = data # property : array (broadcastable to shape)
+
+    def __getitem__(self, name): # array of a property with the full shape (read only view)
+        return np.broadcast_to(self.data[name], self.shape)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def sel(self, **values): # sub result at the given coordinate values (nearest value)
+        index = [slice(None)] * len(DIMS)
+        coords = dict(self.coords)
+        for dim, value in values.items():
+            if dim not in DIMS:
+                raise ValueError(f"unknown dimension {dim}, available dimensions : {', '.join(DIMS)}")
+            i = int(np.argmin(np.abs(np.asarray(self.coords[dim]) - value)))
+            index[DIMS.index(dim)] = slice(i, i + 1)
+            coords[dim] = self.coords[dim][i:i + 1]
+        data = {}
+        for name, values_array in self.data.items():
+            # size 1 axes are kept as they are
+            data[name] = values_array[tuple(slice(None) if values_array.shape[axis] == 1 else index[axis]
+                                            for axis in range(len(DIMS)))]
+        return SweepResult(coords, data)
+
+    def to_xarray(self): # xarray Dataset (requires xarray)
+        try:
+            import xarray
+        except ImportError:
+            raise ImportError("xarray is required to convert the sweep result (pip install xarray)")
+        return xarray.Dataset({name: (DIMS, np.array(self[name])) for name in self.data}, coords=self.coords)
+
+
+def axis(values, dim): # values as an array along the dimension dim (size 1 on the other axes)
+    shape = [1] * len(DIMS)
+    shape[DIMS.index(dim)] = -1
+    return np.asarray(values, dtype=float).reshape(shape)
+
+
+def sweep(profiles, edge=None, mu=None, rho=None, k=None, b=None, tau_source="wall"):
+    # TBL properties of a ProfileSet for every combination of the parameters (None : value of the ProfileSet)
+    # return a SweepResult with the dimensions (edge, mu, rho, k, b, station)
+    if not isinstance(profiles, ProfileSet): # list of "bl_profile"
+        profiles = ProfileSet([[profile.y, profile.u] for profile in profiles], [profile.tau for profile in profiles],
+                              [profile.gradp for profile in profiles], [profile.x for profile in profiles])
+    edge_default = profiles.edge_threshold if profiles.edge_method == "vorticity" else profiles.edge_fraction
+    coords = {"edge": edge, "mu": mu, "rho": rho, "k": k, "b": b}
+    defaults = {"edge": edge_default, "mu": profiles.mu, "rho": profiles.rho, "k": profiles.k, "b": profiles.b}
+    coords = {dim: np.atleast_1d(np.asarray(defaults[dim] if values is None else values, dtype=float))
+              for dim, values in coords.items()}
+    coords["station"] = profiles.x
+    y, u, offsets, station = profiles.y, profiles.u, profiles.offsets, profiles.station
+    n = len(profiles)
+
+    # edge, ẟ* and θ : one pass over all the stations per edge value
+    delta, u_e, delta_star, theta = (np.empty((len(coords["edge"]), n)) for i in range(4))
+    for i, value in enumerate(coords["edge"]):
+        bl_index, delta[i], u_e[i] = boundary_layer_edge(y, u, offsets, profiles.edge_method, value, value,
+                                                         profiles.edge_interpolation)
+        weights = integration_weights(y, offsets, delta[i], profiles.integration)
+        v_frac = u / u_e[i][station]
+        delta_star[i], theta[i] = integrate(np.stack((1 - v_frac, v_frac * (1 - v_frac))), weights, offsets)
+    delta, u_e, delta_star, theta = (a.reshape(-1, 1, 1, 1, 1, n) for a in (delta, u_e, delta_star, theta))
+
+    mu, rho = axis(coords["mu"], "mu"), axis(coords["rho"], "rho")
+    nu = mu / rho
+    x, gradp = axis(profiles.x, "station"), axis(profiles.gradp, "station")
+    if tau_source == "clauser":
+        # all the combinations (edge, mu, rho, k, b) are fitted together as separate stations
+        shape = np.broadcast_shapes(delta.shape, nu.shape, axis(coords["k"], "k").shape, axis(coords["b"], "b").shape)
+        combinations = int(np.prod(shape[:-1]))
+        lengths = np.diff(offsets)
+        all_offsets = np.concatenate(([0], np.cumsum(np.tile(lengths, combinations))))
+        def fit(a): # one value per fitted station
+            return np.broadcast_to(a, shape).ravel()
+        utau = clauser_fit(np.tile(y, combinations), np.tile(u, combinations), all_offsets, fit(delta), fit(nu),
+                           fit(axis(coords["k"], "k")), fit(axis(coords["b"], "b")), u_e=fit(u_e)).reshape(shape)
+        tau = rho * utau**2
+    elif tau_source == "wall":
+        tau = axis(profiles.tau, "station")
+        utau = np.sqrt(tau / rho)
+    else:
+        raise ValueError(f"unknown tau source {tau_source}, available sources : wall, clauser")
+
+    data = {"u_e": u_e, "utau": utau, "delta": delta, "delta_star": delta_star, "theta": theta,
+            "H": delta_star / theta, "Delta": u_e * delta_star / utau,
+            "Re_x": u_e * x / nu, "Re_tau": delta * utau / nu, "Re_theta": u_e * theta / nu,
+            "beta": gradp * delta_star / tau, "p_plus": gradp * nu / utau**3, "K": - nu * gradp / (rho * u_e**3)}
+    return SweepResult(coords, data)
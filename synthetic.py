@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic turbulent boundary layer profiles written as Fluent xy files :
+    the profiles follow Musker's inner law plus Coles' wake
+        u+ = musker(y+) + Π/k * 2 sin²(π/2 y/ẟ) for y < ẟ, u = u_e above ẟ
+    with a wake parameter Π = 0.8 (β + 0.5)^0.75 (Das) following the Clauser parameter β(x)
+
+    For each station :
+        u_e(x) decreases linearly from u_0 (adverse pressure gradient)
+        ẟ(x) = 0.37 x Re_x^-0.2
+        u_τ is solved so that u_e/u_τ = musker(ẟ u_τ/nu) + 2Π/k
+        dp/dx = β τ_w / ẟ*
+
+    The main functions are :
+        synthetic_case : y, u arrays of each station and tau_w, dp/dx at each x
+        write_case : write the 3 Fluent files (profiles, shear-stress, dp_dx) in a directory
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import os
+import numpy as np
+from boundary_layer import bl_profile
+
+def musker(yplus):
+    # Musker's inner law u+(y+) (k = 0.41, s = 0.001093)
+    return (5.424 * np.arctan((2 * yplus - 8.15) / 16.7)
+            + np.log10((yplus + 10.6)**9.6 / (yplus**2 - 8.15 * yplus + 86)**2) - 3.51132976630723)
+
+
+def wall_grid(y_max, points, first=1e-6):
+    # wall normal grid from 0 to y_max, geometric growth from the first cell height
+    # growth ratio r such that first * (r^(points-1) - 1) / (r - 1) = y_max
+    ratio = 1.5
+    for i in range(100):
+        ratio = (y_max * (ratio - 1) / first + 1)**(1 / (points - 1))
+    return first * (ratio**np.arange(points) - 1) / (ratio - 1)
+
+
+def synthetic_case(stations=12, points=200, x_start=1.0, x_end=7.0, u_0=50.0, decrease=0.25, beta_end=2.0):
+    # Return x, profiles ([y, u] of each station), tau_w and dp/dx at each x
+    nu, rho, k = bl_profile.nu, bl_profile.rho, bl_profile.k
+    x = np.linspace(x_start, x_end, stations)
+    u_e = u_0 * (1 - decrease * (x - x_start) / (x_end - x_start))
+    beta = beta_end * (x - x_start) / (x_end - x_start)
+    wake = 0.8 * (beta + 0.5)**0.75
+    delta = 0.37 * x * (u_e * x / nu)**-0.2
+    # friction velocity : u_e/u_τ = musker(ẟ u_τ/nu) + 2Π/k
+    utau = 0.04 * u_e
+    for i in range(50):
+        utau = u_e / (musker(delta * utau / nu) + 2 * wake / k)
+    y = wall_grid(1.0, points)
+    eta = np.minimum(y[None, :] / delta[:, None], 1)
+    u = utau[:, None] * (musker(y[None, :] * utau[:, None] / nu) + wake[:, None] / k * 2 * np.sin(np.pi / 2 * eta)**2)
+    u = np.where(y[None, :] < delta[:, None], np.clip(u, 0, u_e[:, None]), u_e[:, None])
+    tau = rho * utau**2
+    # dp/dx from β and the displacement thickness of the profile
+    delta_star = np.trapz(np.where(y < delta[:, None], 1 - u / u_e[:, None], 0), y, axis=1)
+    gradp = beta * tau / delta_star
+    return x, [[y, u_i] for u_i in u], tau, gradp
+
+
+def write_xy(file, label, columns):
+    # write one "xy/key/label" group
+    file.write(f'((xy/key/label "{label}")\n')
+    np.savetxt(file, np.column_stack(columns), fmt="%.9g", delimiter="\t")
+    file.write(")\n\n")
+
+
+def write_case(directory, x, profiles, tau, gradp):
+    # Write the Fluent files of a case : profiles (one line "x_..." per station), shear-stress, dp_dx
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "profiles"), 'w') as file:
+        file.write('(title "X Velocity")\n(labels "Position" "X Velocity")\n\n')
+        for i, (y, u) in enumerate(profiles):
+            write_xy(file, f"x_{i:07d}", [y, u])
+    # wall data on a grid 10 times finer than the stations
+    x_wall = np.linspace(x[0], x[-1], 10 * len(x))
+    for filename, title, values in (("shear-stress", "Wall Shear Stress", tau), ("dp_dx", "dp-dX", gradp)):
+        with open(os.path.join(directory, filename), 'w') as file:
+            file.write(f'(title "{title}")\n(labels "Position" "{title}")\n\n')
+            write_xy(file, "wall", [x_wall, np.interp(x_wall, x, values)])
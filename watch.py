@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Watch mode for transient simulations :
+    a directory is monitored for the profiles exported by Fluent every N time steps
+    and only the new time step files are read and post processed
+
+    The time step files are found with patterns containing one "*" for the time step, e.g. :
+        profiles : "profiles-*" ("profiles-0100", "profiles-0200" ...)
+        shear stress : "shear-stress-*" (or a fixed file name without "*" if the wall data is not exported)
+        pressure gradient : "dp_dx-*"
+    A time step is processed once the sizes of all its files did not change between two polls (Fluent finished writing them)
+
+    For each time step, one line per station is appended to "history.csv" (ẟ, θ, H, β by default)
+    and the running mean and RMS (of the fluctuations) of each quantity are updated and written
+    to "statistics.csv", the earlier time steps are never read again
+    When the watcher is restarted, the time steps already in "history.csv" are skipped
+    and the statistics are rebuilt from it
+
+Usage :
+    python watch.py run_directory --x 1 2 3 4 4.5 5 --interval 10
+
+@author: Moncef El Moatamid
+date: 2022/2023
+"""
+
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+import numpy as np
+from batch import load_case
+
+QUANTITIES = ("delta", "theta", "H", "beta")
+
+class RunningStatistics:
+    # running mean and RMS of the fluctuations of quantities at each station (Welford's algorithm)
+
+    def __init__(self, quantities=QUANTITIES):
+        self.quantities = quantities
+        self.count = 0
+        self.mean = {}
+        self.m2 = {}
+
+    def update(self, properties): # add one time step
+        self.count += 1
+        for name in self.quantities:
+            value = np.asarray(properties[name], dtype=float)
+            if self.count == 1:
+                self.mean[name] = np.zeros_like(value)
+                self.m2[name] = np.zeros_like(value)
+            difference = value - self.mean[name]
+            self.mean[name] += difference / self.count
+            self.m2[name] += difference * (value - self.mean[name])
+
+    def rms(self): # RMS of the fluctuations of each quantity
+        return {name: np.sqrt(self.m2[name] / self.count) for name in self.quantities}
+
+
+def step_of(filename, pattern):
+    # time step matched by the "*" of pattern in filename
+    prefix, suffix = os.path.basename(pattern).split("*", 1)
+    name = os.path.basename(filename)
+    return name[len(prefix):len(name) - len(suffix)]
+
+
+def step_key(step): # numeric order of the time steps when possible
+    try:
+        return (0, float(step), step)
+    except ValueError:
+        return (1, 0, step)
+
+
+class ProfileWatcher:
+
+    def __init__(self, directory, x, profiles_pattern="profiles-*", tau_pattern="shear-stress-*",
+                 gradp_pattern="dp_dx-*", output=None, quantities=QUANTITIES):
+        self.directory = directory
+        self.x = list(x)
+        self.patterns = (profiles_pattern, tau_pattern, gradp_pattern)
+        self.output = output or directory
+        self.quantities = quantities
+        self.statistics = RunningStatistics(quantities)
+        self.processed = set() # time steps already processed
+        self.sizes = {} # size of the files at the previous poll
+        self.history_file = os.path.join(self.output, "history.csv")
+        self.statistics_file = os.path.join(self.output, "statistics.csv")
+        os.makedirs(self.output, exist_ok=True)
+        self.restore()
+
+    def restore(self):
+        # skip the time steps already in the history and rebuild the statistics from it
+        if not os.path.isfile(self.history_file):
+            return
+        steps = {} # rows of each time step, in the order of the history
+        with open(self.history_file, 'r', newline='') as file:
+            for row in csv.DictReader(file):
+                steps.setdefault(row["step"], []).append(row)
+        for step, rows in steps.items():
+            self.statistics.update({name: [float(row[name]) for row in rows] for name in self.quantities})
+            self.processed.add(step)
+
+    def step_file(self, pattern, step): # file of a time step ("*" replaced by the step)
+        return pattern.replace("*", step, 1)
+
+    def ready_steps(self):
+        # new time steps whose files (profiles, shear stress, pressure gradient) are all completely written
+        # (same size as at the previous poll), in time order
+        ready = []
+        for filename in glob.glob(os.path.join(self.directory, self.patterns[0])):
+            step = step_of(filename, self.patterns[0])
+            if step in self.processed:
+                continue
+            stable = True
+            for pattern in self.patterns:
+                step_file = os.path.join(self.directory, self.step_file(pattern, step))
+                size = os.path.getsize(step_file) if os.path.isfile(step_file) else None
+                stable &= size is not None and self.sizes.get(step_file) == size
+                self.sizes[step_file] = size
+            if stable:
+                ready.append(step)
+        return sorted(ready, key=step_key)
+
+    def process_step(self, step):
+        # post process one time step, append it to the history and update the statistics
+        files = [self.step_file(pattern, step) for pattern in self.patterns]
+        profile_set = load_case(self.directory, self.x, *files, use_cache=False)
+        properties = profile_set.properties()
+        new_file = not os.path.isfile(self.history_file)
+        with open(self.history_file, 'a', newline='') as file:
+            writer = csv.writer(file)
+            if new_file:
+                writer.writerow(["step", "x"] + list(self.quantities))
+            for i in range(len(profile_set)):
+                writer.writerow([step, properties["x"][i]] + [properties[name][i] for name in self.quantities])
+        self.statistics.update(properties)
+        self.processed.add(step)
+        for filename in files:
+            self.sizes.pop(os.path.join(self.directory, filename), None)
+
+    def write_statistics(self):
+        rms = self.statistics.rms()
+        with open(self.statistics_file + ".tmp", 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(["x", "steps"] + [f"{name}_{kind}" for name in self.quantities for kind in ("mean", "rms")])
+            for i, x in enumerate(self.x):
+                row = [x, self.statistics.count]
+                for name in self.quantities:
+                    row += [self.statistics.mean[name][i], rms[name][i]]
+                writer.writerow(row)
+        os.replace(self.statistics_file + ".tmp", self.statistics_file)
+
+    def poll(self):
+        # process the new time steps, return the number of time steps processed
+        steps = self.ready_steps()
+        for step in steps:
+            start = time.perf_counter()
+            try:
+                self.process_step(step)
+            except Exception as error:
+                print(f"time step {step} : FAILED - {type(error).__name__}: {error}", flush=True)
+                self.processed.add(step)
+                continue
+            print(f"time step {step} : done ({time.perf_counter() - start:.2f} s, {self.statistics.count} steps)", flush=True)
+        if steps and self.statistics.count:
+            self.write_statistics()
+        return len(steps)
+
+    def run(self, interval=5, duration=None):
+        # poll the directory every interval seconds (until duration seconds if given, or Ctrl+C)
+        start = time.time()
+        try:
+            while duration is None or time.time() - start < duration:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Post process the time step exports of a transient Fluent run as they are written")
+    parser.add_argument("directory", help="directory where Fluent writes the time step files")
+    parser.add_argument("--x", type=float, nargs="+", required=True, help="x coordinates of the profiles (in increasing order)")
+    parser.add_argument("--profiles", default="profiles-*", help="pattern of the profiles files (\"*\" = time step)")
+    parser.add_argument("--tau", default="shear-stress-*", help="pattern of the wall shear stress files (or fixed file)")
+    parser.add_argument("--gradp", default="dp_dx-*", help="pattern of the pressure gradient files (or fixed file)")
+    parser.add_argument("--output", default=None, help="output directory (default: the watched directory)")
+    parser.add_argument("--interval", type=float, default=5, help="time between two polls [s]")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this time [s]")
+    args = parser.parse_args(argv)
+
+    watcher = ProfileWatcher(args.directory, args.x, args.profiles, args.tau, args.gradp, args.output)
+    print(f"Watching {args.directory} ({len(watcher.processed)} time steps already processed), Ctrl+C to stop", flush=True)
+    watcher.run(args.interval, args.duration)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())